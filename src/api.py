@@ -1,54 +1,102 @@
-import json
-from flask import Flask, request, jsonify
-import joblib
+import os
+import time
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify
 import numpy as np
-from web3 import Web3
 from consensus.hybrid_consensus import UPBFT
-from consensus.dag_blockchain import DAGBlockchain
+from consensus.dag_blockchain import PARKED, DAGBlockchain
 from consensus.trust_model import TrustModel
+from consensus.instrumentation import metrics, PROMETHEUS_CONTENT_TYPE
+from feature_store import SenderFeatureStore
+from model_registry import ModelRegistry
+from onchain.client import get_client
+from onchain.indexer import EVENT_DB, EventStore
+from onchain.validator_sync import sync_trust_model
 
 app = Flask(__name__)
 
-# Load AI model
-model = joblib.load("fraud_detection_model.pkl")
+MODEL_PATH = "fraud_detection_model.pkl"
+RPC_URL = "http://127.0.0.1:8545"
+CONTRACT_ADDRESS = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"
+CONSENSUS_CONTRACT_ADDRESS = os.environ.get("CONSENSUS_CONTRACT_ADDRESS")  # Deployed EnhancedConsensus
 
 # Initialize Blockchain Consensus
 trust_model = TrustModel(nodes=["Node1", "Node2", "Node3", "Node4"])
 consensus = UPBFT(nodes=["Node1", "Node2", "Node3", "Node4"], f=1, trust_model=trust_model)
 blockchain = DAGBlockchain(consensus=consensus)
+blockchain.start_retry_timer()  # ✅ Parked blocks settle even when no new transaction arrives
 
-# Connect to blockchain
-web3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
-contract_address = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"
+# Rolling per-sender activity and stable address encoding for model features
+feature_store = SenderFeatureStore()
 
-# Load ABI from compiled contract JSON
-with open("artifacts/contracts/TransactionStorage.sol/TransactionStorage.json", "r") as f:
-    contract_json = json.load(f)
-    contract_abi = contract_json["abi"]
 
-contract = web3.eth.contract(address=contract_address, abi=contract_abi)
+# ✅ AI model is served from the registry and hot-swapped when a new version is published
+model_registry = ModelRegistry(legacy_model_path=MODEL_PATH)
+
+
+def get_model():
+    """Return the active fraud scorer (loaded on first inference), or None if none is published."""
+    return model_registry.current()
+
+
+# ✅ Web3 provider and contract ABI are loaded on first use, through the shared pooled client
+def get_web3():
+    """Web3 bound to the shared, connection-pooled node client."""
+    return get_client(RPC_URL).web3
+
+
+def get_contract():
+    """Deployed TransactionStorage contract (ABI loaded once, on first use)."""
+    return get_client(RPC_URL).contract("TransactionStorage", CONTRACT_ADDRESS)
+
+
+@lru_cache(maxsize=None)
+def get_event_store():
+    """Open the local contract event index (filled by onchain/indexer.py) on first use."""
+    return EventStore(EVENT_DB)
+
 
 @app.route('/predict', methods=['POST'])
 def predict_fraud():
     """Analyze transaction for fraud & submit to blockchain if safe."""
     data = request.json
-    features = np.array([[data['amount'], data['transaction_time'], data['num_transactions_past_week'], data['sender_encoded'], data['receiver_encoded']]])
-    prediction = model.predict(features)[0]
+    missing = [field for field in ("transaction_id", "sender", "receiver", "amount") if field not in data]
+    if missing:
+        return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
+
+    # ✅ Features are computed server-side from transactions already accepted into the DAG
+    timestamp = time.time()
+    features = np.array([feature_store.features(data['sender'], data['receiver'], data['amount'], timestamp)])
+    model = get_model()
+    if model is None:
+        return jsonify({"error": "No fraud model is available yet."}), 503
+    with metrics.time("model_inference"):
+        prediction = model.predict(features)[0]
+    metrics.inc("fraud_predictions_total", result="fraud" if prediction == 1 else "safe")
 
     if prediction == 1:
-        tx_hash = contract.functions.flagTransaction(data['transaction_id']).transact()
-        web3.eth.wait_for_transaction_receipt(tx_hash)
-        return jsonify({"message": "🚨 Fraud detected!", "transaction_id": data['transaction_id']})
+        tx_hash = get_contract().functions.flagTransaction(data['transaction_id']).transact()
+        get_web3().eth.wait_for_transaction_receipt(tx_hash)
+        return jsonify({"message": "🚨 Fraud detected!", "transaction_id": data['transaction_id'], "model_version": model.version})
     else:
         # Submit transaction to DAG Blockchain Consensus
-        proposer = consensus.elect_leader()
-        blockchain.add_block([data['transaction_id']], proposer)
+        proposer = consensus.elect_leader(blockchain)
+        sender = data['sender']
+        result = blockchain.add_block(
+            [data['transaction_id']], proposer,
+            on_commit=lambda block: feature_store.record(sender, timestamp),  # ✅ Parked block committed later
+        )
+        response = {"transaction_id": data['transaction_id'], "proposer": proposer, "model_version": model.version}
 
-        return jsonify({
-            "message": "✅ Transaction is safe & added to blockchain.",
-            "transaction_id": data['transaction_id'],
-            "proposer": proposer
-        })
+        if result is PARKED:
+            return jsonify(dict(response, status="pending",
+                                message="⏳ Transaction is safe; its block is queued for re-validation.")), 202
+        if not result:
+            return jsonify(dict(response, status="rejected",
+                                error="❌ Transaction is safe but its block was rejected by consensus.")), 409
+
+        feature_store.record(sender, timestamp)
+        return jsonify(dict(response, status="committed", message="✅ Transaction is safe & added to blockchain."))
 
 @app.route('/get_blocks', methods=['GET'])
 def get_blocks():
@@ -59,7 +107,7 @@ def get_blocks():
 @app.route('/get_leader', methods=['GET'])
 def get_leader():
     """Get the current leader from consensus."""
-    leader = consensus.elect_leader()
+    leader = consensus.elect_leader(blockchain)
     return jsonify({"leader": leader})
 
 @app.route('/validate_dag', methods=['GET'])
@@ -68,5 +116,42 @@ def validate_dag():
     is_valid = blockchain.validate_dag()
     return jsonify({"dag_valid": is_valid})
 
+@app.route('/events', methods=['GET'])
+def indexed_events():
+    """Query contract events from the local index instead of the node."""
+    args = request.args
+    events = get_event_store().events(
+        event=args.get('event'),
+        contract=args.get('contract'),
+        tx_id=args.get('tx_id', type=int),
+        account=args.get('account'),
+        from_block=args.get('from_block', type=int),
+        limit=min(args.get('limit', 100, type=int), 1000),
+    )
+    return jsonify({"events": events})
+
+@app.route('/transaction_status/<int:tx_id>', methods=['GET'])
+def transaction_status(tx_id):
+    """On-chain lifecycle of a transaction, reconstructed from indexed events."""
+    status = get_event_store().transaction_status(tx_id, contract=request.args.get('contract', 'EnhancedConsensus'))
+    if status is None:
+        return jsonify({"error": "Transaction not indexed"}), 404
+    return jsonify(status)
+
+@app.route('/sync_validators', methods=['POST'])
+def sync_validators():
+    """Refresh trust scores from on-chain validator reputation in one batched read."""
+    if not CONSENSUS_CONTRACT_ADDRESS:
+        return jsonify({"error": "CONSENSUS_CONTRACT_ADDRESS is not configured"}), 503
+    node_for = (request.get_json(silent=True) or {}).get("node_for")  # Optional {address: node name}
+    contract = get_client(RPC_URL).contract("EnhancedConsensus", CONSENSUS_CONTRACT_ADDRESS)
+    states = sync_trust_model(trust_model, contract, client=get_client(RPC_URL), node_for=node_for)
+    return jsonify({"validators": states})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose consensus and inference instrumentation in Prometheus format."""
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True)
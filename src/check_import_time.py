@@ -0,0 +1,68 @@
+"""Import-time budget check for worker processes, CLI tools and the Flask apps.
+
+Each module is imported in a fresh interpreter; the check fails if the import
+exceeds its time budget or drags in a heavy dependency that should only be
+loaded lazily (plotting, Web3, model deserialization).
+
+Usage (from src/):  python check_import_time.py [--scale 2.0]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Module -> import budget in seconds
+BUDGETS = {
+    "consensus.trust_model": 0.15,
+    "consensus.hybrid_consensus": 0.15,
+    "consensus.dag_blockchain": 0.25,
+    "flask_app": 1.5,
+    "api": 1.5,
+}
+
+# Dependencies that must never be imported at startup
+LAZY_ONLY = ("networkx", "matplotlib", "joblib", "sklearn", "web3", "pandas")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({lazy_only!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module):
+    """Import `module` in a clean interpreter and return (seconds, heavy modules loaded)."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, lazy_only=LAZY_ONLY)],
+        cwd=src_dir, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["seconds"], report["heavy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow CI hosts).")
+    parser.add_argument("modules", nargs="*", help="Subset of modules to check (default: all).")
+    args = parser.parse_args()
+
+    failures = 0
+    for module in args.modules or BUDGETS:
+        budget = BUDGETS.get(module, 1.0) * args.scale
+        seconds, heavy = measure(module)
+        ok = seconds <= budget and not heavy
+        failures += not ok
+        status = "✅" if ok else "❌"
+        extra = f" (eagerly imported: {', '.join(heavy)})" if heavy else ""
+        print(f"[IMPORT BUDGET] {status} {module}: {seconds * 1000:.1f} ms / {budget * 1000:.0f} ms{extra}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
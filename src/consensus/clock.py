@@ -0,0 +1,71 @@
+import heapq
+import itertools
+import time
+
+
+class SystemClock:
+    """Wall-clock time; the default for live nodes."""
+
+    def time(self):
+        return time.time()
+
+
+class VirtualClock:
+    """Simulation time that only moves when the scheduler (or a test) advances it."""
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        if seconds < 0:
+            raise ValueError("Virtual time cannot move backwards.")
+        self.now += seconds
+
+    def advance_to(self, timestamp):
+        self.advance(timestamp - self.now)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class EventScheduler:
+    """
+    Discrete-event loop over a VirtualClock.
+
+    Events run in timestamp order (FIFO for ties); before each one the clock
+    jumps straight to its timestamp, so idle time costs nothing.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or VirtualClock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self.processed = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def schedule_at(self, timestamp, callback, *args):
+        heapq.heappush(self._queue, (timestamp, next(self._sequence), callback, args))
+
+    def schedule(self, delay, callback, *args):
+        self.schedule_at(self.clock.time() + delay, callback, *args)
+
+    def run(self, until=None, max_events=None):
+        """Process events up to virtual time `until`; returns the number processed."""
+        processed = 0
+        while self._queue and (max_events is None or processed < max_events):
+            timestamp, _, callback, args = self._queue[0]
+            if until is not None and timestamp > until:
+                break
+            heapq.heappop(self._queue)
+            self.clock.advance_to(timestamp)
+            callback(*args)
+            processed += 1
+        if until is not None and self.clock.time() < until and (max_events is None or processed < max_events):
+            self.clock.advance_to(until)
+        self.processed += processed
+        return processed
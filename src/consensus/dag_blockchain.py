@@ -1,12 +1,48 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import hashlib
+import heapq
+import itertools
+import threading
 import time
-import networkx as nx
-import matplotlib.pyplot as plt
 import rsa
+from . import dag_export
+from .clock import SYSTEM_CLOCK
+from .instrumentation import metrics
 
-# Generate RSA keys for signing
-(public_key, private_key) = rsa.newkeys(512)
+# Near-miss blocks are parked and re-validated with exponential backoff
+RETRY_BASE_DELAY = 0.5  # Seconds before the first re-validation
+RETRY_MAX_DELAY = 30.0
+MAX_PARKED_BLOCKS = 256  # Bound on the retry queue
+MAX_RETRY_STATE = 4096  # Bound on per-block retry counters (least recently retried evicted first)
+PARENT_WINDOW = 5  # Recent blocks eligible as parents
+
+
+class _Parked:
+    """add_block() result for a block waiting in the retry queue; falsy, as it is not in the DAG yet."""
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "PARKED"
+
+
+PARKED = _Parked()
+
+# RSA keys for signing are generated on first use, not at import time
+_keys = None
+_keys_lock = threading.Lock()
+
+
+def get_signing_keys():
+    """Return the process-wide (public_key, private_key) pair, generating it on first use."""
+    global _keys
+    if _keys is None:
+        with _keys_lock:
+            if _keys is None:
+                _keys = rsa.newkeys(512)
+    return _keys
 
 class Block:
     """Represents a single block in the DAG blockchain."""
@@ -16,9 +52,12 @@ class Block:
         self.transactions = transactions
         self.proposer = proposer
         self.trust_score = trust_score  # ✅ FIX: Added trust_score to Block
-        self.timestamp = timestamp or time.time()
-        self.hash = self.compute_hash()
-        self.signature = self.sign_block()
+        self.timestamp = time.time() if timestamp is None else timestamp  # 0.0 is a valid virtual time
+        with metrics.time("hashing"):
+            self.hash = self.compute_hash()
+        get_signing_keys()  # ✅ One-off key generation stays out of the signing latency
+        with metrics.time("signing"):
+            self.signature = self.sign_block()
 
     def compute_hash(self):
         """Computes SHA-256 hash of block data."""
@@ -27,35 +66,50 @@ class Block:
 
     def sign_block(self):
         """Sign the block with RSA private key."""
-        return rsa.sign(self.hash.encode(), private_key, 'SHA-256')
+        return rsa.sign(self.hash.encode(), get_signing_keys()[1], 'SHA-256')
 
     def verify_signature(self):
         """Verify the block's signature using the public key."""
         try:
-            rsa.verify(self.hash.encode(), self.signature, public_key)
+            rsa.verify(self.hash.encode(), self.signature, get_signing_keys()[0])
             return True
         except rsa.VerificationError:
             return False
 class DAGBlockchain:
-    def __init__(self, consensus):
+    def __init__(self, consensus, clock=None):
         self.consensus = consensus
+        self.clock = clock or getattr(consensus, "clock", SYSTEM_CLOCK)  # ✅ Block timestamps follow the consensus clock
         self.blocks = []
+        self.block_by_hash = {}
         self.graph = defaultdict(list)
+        self.retry_counts = OrderedDict()  # block hash -> retries so far, bounded by MAX_RETRY_STATE
+        self.retry_queue = []  # Heap of (due time, sequence, block, (on_commit, on_drop))
+        self._retry_sequence = itertools.count()
+        self._next_index = 0  # Parked blocks keep their index, so indices can't be len(self.blocks)
+        self._lock = threading.RLock()  # add_block and the retry timer may run on different threads
+        self._retry_timer = None  # (thread, stop event) once start_retry_timer() is called
         self.create_genesis_block()
 
     def create_genesis_block(self):
         """Creates a genesis block to initialize the DAG with a valid trust score."""
         genesis_block = Block(
-            index=0, 
+            index=self._allocate_index(), 
             previous_hashes=[], 
             transactions=["Genesis Block"], 
             proposer="System", 
-            trust_score=1.0  # ✅ FIX: Assign default trust score to Genesis Block
+            trust_score=1.0,  # ✅ FIX: Assign default trust score to Genesis Block
+            timestamp=self.clock.time()
         )
         self.blocks.append(genesis_block)
+        self.block_by_hash[genesis_block.hash] = genesis_block
         self.graph[genesis_block.hash] = []
         print("[INFO] ✅ Genesis Block Created with Trust Score 1.0.")
 
+    def _allocate_index(self):
+        index = self._next_index
+        self._next_index += 1
+        return index
+
 
     def get_parent_blocks(self):
         """Retrieve parent blocks using adaptive trust-weighted selection."""
@@ -63,7 +117,7 @@ class DAGBlockchain:
             return [self.blocks[-1].hash]  # If only the genesis block exists, return it
 
         # ✅ Select the last 5 blocks for more diversity (better DAG structure)
-        parent_candidates = self.blocks[-5:]
+        parent_candidates = self.blocks[-PARENT_WINDOW:]
 
         # ✅ Compute **rolling trust score average** for better parent selection
         avg_trust_score = sum(b.trust_score for b in parent_candidates) / max(1, len(parent_candidates))
@@ -83,49 +137,171 @@ class DAGBlockchain:
 
 
 
-    def add_block(self, transactions, proposer_node):
-        """Adds a block, ensuring trust-based consensus and adaptive retries."""
+    def add_block(self, transactions, proposer_node, on_commit=None, on_drop=None):
+        """
+        Adds a block, ensuring trust-based consensus and adaptive retries.
+
+        Returns the new block once it is in the DAG, None if it was rejected,
+        or PARKED if it narrowly failed and waits in the retry queue. Callers
+        must not resubmit parked transactions: the same block is re-validated
+        later, and `on_commit(block)` or `on_drop(block)` is called once it is
+        finally committed or rejected.
+        """
+        start_time = time.perf_counter()
+        try:
+            with self._lock, metrics.time("add_block"):
+                self._process_retries()
+                return self._add_block(transactions, proposer_node, (on_commit, on_drop))
+        finally:
+            # ✅ Keep UPBFT TPS / latency figures fed with real block production time
+            self.consensus.performance_metrics["total_time"] += time.perf_counter() - start_time
+
+    def _add_block(self, transactions, proposer_node, callbacks):
         print(f"[INFO] 🏗️ Attempting to add block with transactions: {transactions} from {proposer_node}")
 
         if proposer_node in self.consensus.malicious_nodes:
             print(f"[SECURITY] 🚨 Block rejected! Byzantine proposer {proposer_node} detected.")
+            metrics.inc("dag_blocks_rejected_total", reason="byzantine_proposer")
             return None
 
-        parent_hashes = self.get_parent_blocks()
+        with metrics.time("parent_selection"):
+            parent_hashes = self.get_parent_blocks()
         if not parent_hashes:
             print("[ERROR] ❌ Block rejected! No valid parent blocks found.")
+            metrics.inc("dag_blocks_rejected_total", reason="no_parents")
             return None
 
         trust_score = self.consensus.trust_model.trust_scores.get(proposer_node, 0.5)
 
-        new_block = Block(len(self.blocks), parent_hashes, transactions, proposer_node, trust_score)
+        new_block = Block(self._allocate_index(), parent_hashes, transactions, proposer_node, trust_score,
+                          timestamp=self.clock.time())
+        return self._settle_block(new_block, callbacks)
 
-        validation_result = self.validate_block(new_block)
-    
-        # ✅ Adaptive Retry Mechanism
+    def _settle_block(self, block, callbacks):
+        """Validate a signed block and commit, park or reject it; returns the block, PARKED or None."""
+        with metrics.time("validation"):
+            validation_result = self.validate_block(block)
+
+        # ✅ Adaptive Retry Mechanism: park near misses instead of dropping them
         if validation_result == "RETRY":
-            print(f"[SECURITY] 🔄 Block {new_block.index} ALMOST passed, retrying validation...")
-            return None  # Allow retry logic to handle it
+            metrics.inc("dag_block_retries_total")
+            return PARKED if self._park_block(block, callbacks) else None
 
         if not validation_result:
+            metrics.inc("dag_blocks_rejected_total", reason="validation")
+            self.retry_counts.pop(block.hash, None)
             # ❌ Mark proposer as suspicious after multiple failures
-            self.consensus.trust_model.misbehavior_count[proposer_node] += 1
-            if self.consensus.trust_model.misbehavior_count[proposer_node] >= 3:
-                print(f"[SECURITY ALERT] 🚨 Proposer {proposer_node} blacklisted due to repeated failures.")
-                self.consensus.malicious_nodes.add(proposer_node)  # Ban node permanently
+            self.consensus.trust_model.misbehavior_count[block.proposer] += 1
+            if self.consensus.trust_model.misbehavior_count[block.proposer] >= 3:
+                print(f"[SECURITY ALERT] 🚨 Proposer {block.proposer} blacklisted due to repeated failures.")
+                self.consensus.malicious_nodes.add(block.proposer)  # Ban node permanently
             return None  # Block failed validation
 
-        self.blocks.append(new_block)
-        for parent in parent_hashes:
-            self.graph[parent].append(new_block.hash)
-        self.graph[new_block.hash] = []
+        return self._commit_block(block)
+
+    def _commit_block(self, block):
+        """Append a validated block to the DAG and credit its proposer."""
+        self.retry_counts.pop(block.hash, None)
+        self.blocks.append(block)
+        self.block_by_hash[block.hash] = block
+        for parent in block.previous_hashes:
+            self.graph[parent].append(block.hash)
+        self.graph[block.hash] = []
 
         # ✅ **Gradually Adjust Trust Score for Proposer**
-        success_ratio = 0.75 if validation_result else 0.5  # Partial success scoring
-        self.consensus.trust_model.update_trust_score(proposer_node, successful_blocks=success_ratio, total_attempts=5)
+        success_ratio = 0.75  # Partial success scoring
+        with metrics.time("trust_update"):
+            self.consensus.trust_model.update_trust_score(block.proposer, successful_blocks=success_ratio, total_attempts=5)
+        successful_proposals = self.consensus.trust_model.successful_proposals
+        successful_proposals[block.proposer] = successful_proposals.get(block.proposer, 0) + 1  # ✅ Feeds leader eligibility
+        metrics.inc("dag_blocks_added_total")
+        metrics.inc("dag_transactions_total", len(block.transactions))
+
+        print(f"[BLOCK ADDED] ✅ Block {block.index} by {block.proposer} (Trust Score: {block.trust_score:.2f}).")
+        return block
+
+    def _park_block(self, block, callbacks):
+        """Queue a near-miss block for re-validation after an exponential backoff; False if the queue is full."""
+        if len(self.retry_queue) >= MAX_PARKED_BLOCKS:
+            print(f"[SECURITY] ❌ Block {block.index} dropped, retry queue full.")
+            metrics.inc("dag_blocks_rejected_total", reason="retry_queue_full")
+            self.retry_counts.pop(block.hash, None)
+            return False
+        attempts = self.retry_counts.get(block.hash, 1)
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        heapq.heappush(self.retry_queue, (self.clock.time() + delay, next(self._retry_sequence), block, callbacks))
+        print(f"[SECURITY] 🔄 Block {block.index} ALMOST passed, re-validating in {delay:.1f}s.")
+        return True
 
-        print(f"[BLOCK ADDED] ✅ Block {new_block.index} by {proposer_node} (Trust Score: {trust_score:.2f}).")
-        return new_block
+    @staticmethod
+    def _notify(callback, block):
+        if callback is None:
+            return
+        try:
+            callback(block)
+        except Exception as e:  # A caller's hook must not break block production for everyone else
+            print(f"[ERROR] ❌ Retry callback for block {block.index} failed: {e}")
+
+    def _record_retry(self, block_hash, attempts):
+        self.retry_counts[block_hash] = attempts
+        self.retry_counts.move_to_end(block_hash)
+        while len(self.retry_counts) > MAX_RETRY_STATE:
+            self.retry_counts.popitem(last=False)
+
+    def _process_retries(self):
+        committed = []
+        now = self.clock.time()
+        while self.retry_queue and self.retry_queue[0][0] <= now:
+            _, _, block, callbacks = heapq.heappop(self.retry_queue)
+            on_commit, on_drop = callbacks
+            if block.proposer in self.consensus.malicious_nodes:
+                print(f"[SECURITY] 🚨 Parked block {block.index} dropped, proposer {block.proposer} is blacklisted.")
+                metrics.inc("dag_blocks_rejected_total", reason="byzantine_proposer")
+                self.retry_counts.pop(block.hash, None)
+                self._notify(on_drop, block)
+                continue
+            # Same signed block, re-validated against the DAG as it is now
+            result = self._settle_block(block, callbacks)
+            if result:
+                committed.append(block)
+                self._notify(on_commit, block)
+            elif result is not PARKED:
+                self._notify(on_drop, block)
+        return committed
+
+    def process_retries(self):
+        """Re-validate parked blocks whose backoff has expired; returns the blocks committed."""
+        with self._lock, metrics.time("retries"):
+            return self._process_retries()
+
+    def start_retry_timer(self, interval=RETRY_BASE_DELAY):
+        """
+        Re-validate parked blocks every `interval` seconds from a daemon thread.
+
+        Without it parked blocks are only retried by the next add_block(), so
+        an idle service would never settle them.
+        """
+        if self._retry_timer is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=self._run_retry_timer, args=(stop, interval),
+                                      name="dag-retry-timer", daemon=True)
+            self._retry_timer = (thread, stop)
+            thread.start()
+        return self._retry_timer[0]
+
+    def stop_retry_timer(self):
+        if self._retry_timer is not None:
+            thread, stop = self._retry_timer
+            stop.set()
+            thread.join()
+            self._retry_timer = None
+
+    def _run_retry_timer(self, stop, interval):
+        while not stop.wait(interval):
+            try:
+                self.process_retries()
+            except Exception as e:  # Keep retrying; one bad pass must not stop the timer
+                print(f"[ERROR] ❌ Retry timer pass failed: {e}")
 
     
 
@@ -144,23 +320,16 @@ class DAGBlockchain:
         avg_trust_score = sum(b.trust_score for b in recent_blocks) / max(1, len(recent_blocks))
         base_threshold = max(total_weight * 0.50, avg_trust_score * 0.70)  # Adaptive trust threshold
 
-        if not hasattr(self, 'retry_counts'):
-            self.retry_counts = {}
-
-        block_id = block.index
-        if block_id not in self.retry_counts:
-            self.retry_counts[block_id] = 0
-
-        retry_attempts = self.retry_counts[block_id]
+        retry_attempts = self.retry_counts.get(block.hash, 0)
         adjusted_threshold = base_threshold * max(0.75, min(1.2, len(self.blocks) / 50))
         retry_threshold = adjusted_threshold * (0.92 - 0.02 * retry_attempts)
 
-        parent_weight = sum(b.trust_score for b in self.blocks if b.hash in block.previous_hashes)
+        parent_weight = sum(self.block_by_hash[h].trust_score for h in set(block.previous_hashes) if h in self.block_by_hash)
 
         if parent_weight < adjusted_threshold:
             if parent_weight >= retry_threshold:
                 if retry_attempts < 3:
-                    self.retry_counts[block.index] += 1
+                    self._record_retry(block.hash, retry_attempts + 1)
                     print(f"[SECURITY] 🔄 Block {block.index} ALMOST passed, retrying (attempt {retry_attempts + 1}/3)...")
                     return "RETRY"
                 else:
@@ -208,42 +377,27 @@ class DAGBlockchain:
         print("[SUCCESS] ✅ DAG Blockchain is valid!")
         return True
 
-    def visualize_dag(self, malicious_nodes=None, num_blocks=50):
-        """Visualize only the last `num_blocks` blocks to keep the diagram readable."""
+    def export_dag(self, path, fmt=None, chunk_size=10000):
+        """Stream the full DAG to DOT, GraphML or JSON without building a graph in memory."""
+        return dag_export.export_dag(self.blocks, path, fmt=fmt, chunk_size=chunk_size)
+
+    def visualize_dag(self, malicious_nodes=None, num_blocks=50, output_path="dag_structure_subset.png",
+                      show=False, verbose=False):
+        """Render the last `num_blocks` blocks (all if None) with a layered layout; headless unless `show`."""
         print("\n[DAG Blockchain Structure Visualization]")
 
         # Subset the last `num_blocks`
-        subset_blocks = self.blocks[-num_blocks:] if len(self.blocks) > num_blocks else self.blocks
-        subset_hashes = {blk.hash for blk in subset_blocks}
-        dag = nx.DiGraph()
-
-        for blk in subset_blocks:
-            dag.add_node(blk.hash, label=f"Block {blk.index}")
-            for parent in blk.previous_hashes:
-                if parent in subset_hashes:
-                    dag.add_edge(parent, blk.hash)
-
+        subset_blocks = self.blocks[-num_blocks:] if num_blocks else self.blocks
         print(f"[INFO] Subset of DAG: {len(subset_blocks)} blocks (out of {len(self.blocks)} total).")
-        for b in subset_blocks:
-            print(f"  ➡ Block {b.index}: Transactions: {b.transactions}")
-
-        plt.figure(figsize=(12, 6))
-        pos = nx.spring_layout(dag, seed=42)  
-        labels = {node: dag.nodes[node]['label'] for node in dag.nodes}
-
-        node_colors = ["red" if node in (malicious_nodes or []) else "lightblue" for node in dag.nodes]
-
-        nx.draw(
-            dag, pos, with_labels=True, labels=labels,
-            node_color=node_colors, edge_color="gray",
-            node_size=1500, font_size=10
+        if verbose:
+            for b in subset_blocks:
+                print(f"  ➡ Block {b.index}: Transactions: {b.transactions}")
+
+        dag_export.draw_dag(
+            dag_export.block_records(subset_blocks), output_path,
+            title=f"DAG Blockchain (Last {len(subset_blocks)} Blocks)",
+            highlight_proposers=malicious_nodes, show=show,
         )
-        plt.title(f"DAG Blockchain (Last {num_blocks} Blocks)")
-
-        plt.savefig("dag_structure_subset.png")
-        print("[INFO] DAG subset image saved as dag_structure_subset.png")
-
-        plt.show(block=True)
 
     def check_for_conflicts(self, new_block):
         """Allow re-validation of double-spend transactions after a delay."""
@@ -252,7 +406,7 @@ class DAGBlockchain:
             for tx in blk.transactions:
                 if tx in new_block.transactions:
                     # Allow retry if the block is recent
-                    if time.time() - blk.timestamp < 5:  # 5-second delay window
+                    if self.clock.time() - blk.timestamp < 5:  # 5-second delay window
                         print(f"[SECURITY ALERT] Double-spend detected for transaction {tx}! Retrying after leader change...")
                         return "RETRY"  # Allow the system to retry later
                     return True  # Conflict detected
@@ -1,15 +1,20 @@
+import math
 import random
-import numpy as np
 import time
+from .clock import SYSTEM_CLOCK
+from .instrumentation import metrics
 
 class UPBFT:
-    def __init__(self, nodes, f, trust_model=None):  # ✅ Allow optional trust_model
+    def __init__(self, nodes, f, trust_model=None, clock=None, rng=None):  # ✅ Allow optional trust_model
         self.nodes = nodes
         self.f = f
         self.trust_model = trust_model  # ✅ Store trust_model if provided
+        # ✅ Share the trust model's clock and RNG unless given explicitly
+        self.clock = clock or getattr(trust_model, "clock", SYSTEM_CLOCK)
+        self.rng = rng or getattr(trust_model, "rng", random)
         self.leader_index = 0
         self.malicious_nodes = set()
-        self.node_scores = {node: np.random.uniform(0, 1) for node in self.nodes}
+        self.node_scores = {node: self.rng.uniform(0, 1) for node in self.nodes}
         self.performance_metrics = {"total_transactions": 0, "total_time": 0.00001}
         self.leader_rounds = 0
         self.leader = None
@@ -33,12 +38,20 @@ class UPBFT:
         - Uses trust-weighted voting for selection.
         - Implements leader rotation to prevent starvation.
         """
-
+        start_time = time.perf_counter()
+        try:
+            with metrics.time("elect_leader"):
+                return self._elect_leader(blockchain, rounds, top_n)
+        finally:
+            self.performance_metrics["total_time"] += time.perf_counter() - start_time
+
+    def _elect_leader(self, blockchain, rounds, top_n):
         # ✅ Step 1: Apply trust decay for inactive nodes
+        now = self.clock.time()
         for node in self.nodes:
-            last_activity = self.trust_model.last_activity.get(node, time.time())
-            time_since_last_activity = max(1, time.time() - last_activity)
-            decay_factor = np.exp(-0.005 * time_since_last_activity)  # Slower decay to prevent rapid trust loss
+            last_activity = self.trust_model.last_activity.get(node, now)
+            time_since_last_activity = max(1, now - last_activity)
+            decay_factor = math.exp(-0.005 * time_since_last_activity)  # Slower decay to prevent rapid trust loss
             self.trust_model.trust_scores[node] *= decay_factor
 
         # ✅ Step 2: Allow recovery of previously blacklisted nodes if their trust score improves
@@ -50,22 +63,14 @@ class UPBFT:
                 restored_nodes.append(node)
 
         if restored_nodes:
-            return self.elect_leader(blockchain, rounds, top_n)  # Retry election after restoration
+            return self._elect_leader(blockchain, rounds, top_n)  # Retry election after restoration
 
         # ✅ Step 3: Exclude blacklisted nodes but allow recovery
-        valid_nodes = sorted(
-            [
-                node for node in self.nodes
-                if node not in self.trust_model.malicious_nodes
-                and self.trust_model.get_trust_score(node) > 0.3
-                and self.trust_model.successful_proposals.get(node, 0) >= (0 if len(blockchain.blocks) < 5 else 2)
-            ],
-            key=lambda x: self.trust_model.get_trust_score(x),
-            reverse=True
-        )
+        valid_nodes = self.eligible_leaders(blockchain)
 
         if not valid_nodes:
             print("[SECURITY ALERT] ❌ No possible leaders available. Halting consensus for this round.")
+            metrics.inc("upbft_election_failures_total")
             return None
 
         # ✅ Step 4: Keep the current leader if they meet the performance threshold
@@ -78,11 +83,30 @@ class UPBFT:
 
         # ✅ Step 5: Select leader from top trusted nodes
         top_candidates = valid_nodes[:top_n]
-        self.leader = random.choice(top_candidates)
+        self.leader = self.rng.choice(top_candidates)
+        metrics.inc("upbft_leader_changes_total")
 
         print(f"[LEADER ELECTION] ✅ New Leader: {self.leader} (Trust Score: {self.trust_model.get_trust_score(self.leader):.2f})")
         return self.leader
 
+    def eligible_leaders(self, blockchain):
+        """
+        Nodes that could be elected now, most trusted first.
+
+        Read-only: no decay, rotation or metrics, so it is safe for checks
+        such as cross-shard votes that must not disturb the election.
+        """
+        return sorted(
+            [
+                node for node in self.nodes
+                if node not in self.trust_model.malicious_nodes
+                and self.trust_model.get_trust_score(node) > 0.3
+                and self.trust_model.successful_proposals.get(node, 0) >= (0 if len(blockchain.blocks) < 5 else 2)
+            ],
+            key=lambda x: self.trust_model.get_trust_score(x),
+            reverse=True
+        )
+
     def optimize_node_selection(self):
         """Prioritize non-Byzantine nodes for consensus decision-making."""
         sorted_nodes = sorted(self.node_scores.items(), key=lambda x: x[1], reverse=True)
@@ -105,6 +129,7 @@ class UPBFT:
     def commit(self, prepared_msg):
         """Simulate the commit step in PBFT."""
         self.performance_metrics["total_transactions"] += 1
+        metrics.inc("upbft_commits_total")
         return True
 
     def get_performance_metrics(self):
@@ -127,7 +152,7 @@ class UPBFT:
         new_byzantine_nodes = set()
 
         for node in self.nodes:
-            if random.random() < failure_rate:
+            if self.rng.random() < failure_rate:
                 new_byzantine_nodes.add(node)
                 fake_tx = f"FakeTx-{node}"
                 attacked_transactions.append(fake_tx)
@@ -0,0 +1,87 @@
+import os
+import threading
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+# Latency buckets (seconds) shared by every phase histogram
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PHASE_METRIC = "consensus_phase_duration_seconds"
+
+
+class _NullTimer:
+    """Shared no-op context manager returned while instrumentation is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Switchable front end over a prometheus_client registry.
+
+    Metrics are declared on first use, with the label names of that first
+    call, so call sites stay one-liners; while disabled every call is a no-op.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.registry = CollectorRegistry()
+        self._metrics = {}  # name -> prometheus_client metric
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _get(self, kind, name, labels, help_text="", **options):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = kind(name, help_text, sorted(labels), registry=self.registry, **options)
+                    self._metrics[name] = metric
+        return metric.labels(**labels) if labels else metric
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter; a no-op while instrumentation is disabled."""
+        if not self.enabled:
+            return
+        self._get(Counter, name, labels).inc(amount)
+
+    def observe(self, name, value, **labels):
+        """Record a single histogram observation."""
+        if not self.enabled:
+            return
+        self._get(Histogram, name, labels, buckets=DEFAULT_BUCKETS).observe(value)
+
+    def time(self, phase):
+        """Context manager timing one consensus phase into the phase histogram."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._get(Histogram, PHASE_METRIC, {"phase": phase}, "Wall-clock time spent per consensus phase.",
+                         buckets=DEFAULT_BUCKETS).time()
+
+    def reset(self):
+        with self._lock:
+            self.registry = CollectorRegistry()
+            self._metrics = {}
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        return generate_latest(self.registry).decode()
+
+
+# Shared registry; set CONSENSUS_METRICS=0 to switch instrumentation off
+metrics = MetricsRegistry(enabled=os.environ.get("CONSENSUS_METRICS", "1") != "0")
+
+PROMETHEUS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -0,0 +1,448 @@
+"""Sharded DAG blockchain for multi-core throughput.
+
+Transactions are partitioned by a key (the sender by default) over several
+DAG shards. Each shard runs its own TrustModel, UPBFT committee and
+DAGBlockchain in a separate worker process, so block production is not
+serialized by the GIL. Transactions whose sender and receiver live on
+different shards go through a two-phase commit driven by the coordinator,
+and every `checkpoint_every` submit() rounds the coordinator hashes the
+shard headers into a global checkpoint.
+
+    python -m consensus.sharding --shards 1,2,4 --transactions 20000
+"""
+import argparse
+import contextlib
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+import zlib
+from .dag_blockchain import PARKED, DAGBlockchain
+from .hybrid_consensus import UPBFT
+from .trust_model import TrustModel
+
+MAX_PENDING = 10_000  # Cross-shard transactions a shard holds (prepared or awaiting a block) before voting no
+CHECKPOINT_EVERY = 10  # submit() rounds between global checkpoints
+
+
+def sender_key(tx):
+    """Partition key: the sender of dict transactions, the transaction itself otherwise."""
+    return tx.get("sender") if isinstance(tx, dict) else tx
+
+
+def receiver_key(tx):
+    """Second shard touched by a transaction, or None for single-key transactions."""
+    return tx.get("receiver") if isinstance(tx, dict) else None
+
+
+def shard_for(key, num_shards):
+    """Stable shard assignment, identical in every process and across restarts."""
+    return zlib.crc32(str(key).encode()) % num_shards
+
+
+class ShardError(Exception):
+    """A shard worker failed while executing a command."""
+
+    def __init__(self, shard_id, details):
+        super().__init__(f"Shard {shard_id} failed:\n{details}")
+        self.shard_id = shard_id
+
+
+class _Shard:
+    """State owned by one worker process: a committee, its consensus and its DAG."""
+
+    def __init__(self, shard_id, committee, f, seed, block_size, max_pending=MAX_PENDING):
+        rng = random.Random(f"{seed}/{shard_id}") if seed is not None else random.Random()
+        self.shard_id = shard_id
+        self.committee = committee
+        self.block_size = block_size
+        self.max_pending = max_pending
+        self.trust_model = TrustModel(committee, rng=rng)
+        self.consensus = UPBFT(list(committee), f=f, trust_model=self.trust_model)
+        self.blockchain = DAGBlockchain(self.consensus)
+        self.prepared = {}  # tx_id -> (tx, locked key)
+        self.locked = set()
+        self.pending = []  # (tx_id, tx) of committed cross-shard transactions not yet in a block, oldest first
+        self.landed = []  # tx_ids of cross-shard transactions included since the last report
+        self.included = 0
+
+    def _propose(self, chunk, on_commit=None, on_drop=None):
+        """Elect a proposer and add one block; returns the block, PARKED or None."""
+        proposer = self.consensus.elect_leader(self.blockchain)
+        if not proposer:
+            return None
+        return self.blockchain.add_block(chunk, proposer, on_commit=on_commit, on_drop=on_drop)
+
+    def _take_landed(self):
+        landed, self.landed = self.landed, []
+        return landed
+
+    def _committed_late(self, block):
+        self.included += len(block.transactions)
+
+    def _land(self, entries, block=None):
+        self.included += len(entries)
+        self.landed.extend(tx_id for tx_id, _ in entries)
+
+    def _requeue(self, entries, block=None):
+        self.pending.extend(entries)
+
+    def _flush_pending(self):
+        """
+        Retry committed cross-shard transactions that are not in a block yet.
+
+        Stops at the first block that is rejected, so the backlog keeps its
+        order; parked blocks leave `pending` and come back only if dropped.
+        """
+        while self.pending:
+            entries = self.pending[:self.block_size]
+            result = self._propose([tx for _, tx in entries], on_commit=functools.partial(self._land, entries),
+                                   on_drop=functools.partial(self._requeue, entries))
+            if not result and result is not PARKED:
+                break
+            del self.pending[:len(entries)]  # Retry callbacks only ever append behind these
+            if result:
+                self._land(entries)
+
+    def submit(self, transactions):
+        """
+        Local transactions, after any committed cross-shard ones still waiting for a block.
+
+        Returns (included, rejected, parked, tx_ids of cross-shard transactions included meanwhile).
+        """
+        self._flush_pending()
+        included, rejected, parked = 0, 0, 0
+        for start in range(0, len(transactions), self.block_size):
+            chunk = transactions[start:start + self.block_size]
+            result = self._propose(chunk, on_commit=self._committed_late)
+            if result:
+                included += len(chunk)
+            elif result is PARKED:
+                parked += len(chunk)
+            else:
+                rejected += len(chunk)
+        self.included += included
+        return included, rejected, parked, self._take_landed()
+
+    def prepare(self, proposals):
+        """Phase 1: lock the local key of each (tx_id, tx, key) and vote; returns {tx_id: vote}."""
+        # ✅ Read-only check: voting must not run an election (decay, leader rotation, metrics)
+        electable = bool(self.consensus.eligible_leaders(self.blockchain))
+        votes = {}
+        for tx_id, tx, key in proposals:
+            # ✅ Backpressure: no new cross-shard work while the backlog is full
+            vote = (electable and key not in self.locked
+                    and len(self.pending) + len(self.prepared) < self.max_pending)
+            if vote:
+                self.locked.add(key)
+                self.prepared[tx_id] = (tx, key)
+            votes[tx_id] = vote
+        return votes
+
+    def commit(self, tx_ids):
+        """
+        Phase 2 (commit): release locks and queue the transactions for the next block.
+
+        Returns the tx_ids of cross-shard transactions included meanwhile.
+        """
+        for tx_id in tx_ids:
+            tx, key = self.prepared.pop(tx_id)
+            self.locked.discard(key)
+            self.pending.append((tx_id, tx))
+        self._flush_pending()  # Committed transactions are never dropped
+        return self._take_landed()
+
+    def abort(self, tx_ids):
+        """Phase 2 (abort): release locks of transactions this shard had prepared."""
+        for tx_id in tx_ids:
+            entry = self.prepared.pop(tx_id, None)
+            if entry:
+                self.locked.discard(entry[1])
+        return len(tx_ids)
+
+    def header(self):
+        blocks = self.blockchain.blocks
+        return {
+            "shard": self.shard_id,
+            "height": len(blocks),
+            "last_hash": blocks[-1].hash,
+            "tips": sorted(h for h, children in self.blockchain.graph.items() if not children),
+            "transactions": self.included,
+            "pending": len(self.pending),
+            "prepared": len(self.prepared),
+            "committee": self.committee,
+        }
+
+
+def _shard_worker(conn, shard_id, committee, f, seed, block_size, max_pending, quiet):
+    """Worker process loop: execute (command, *args) messages until "stop"."""
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext()):
+        shard = _Shard(shard_id, committee, f, seed, block_size, max_pending)
+        while True:
+            command, *args = conn.recv()
+            if command == "stop":
+                break
+            try:
+                conn.send(("ok", getattr(shard, command)(*args)))
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+class ShardedDAGBlockchain:
+    """Coordinator for `num_shards` DAG shards, each running in its own process."""
+
+    def __init__(self, nodes, num_shards=None, f=1, committee_size=None, block_size=100,
+                 seed=None, key=sender_key, cross_key=receiver_key, max_pending=MAX_PENDING,
+                 checkpoint_every=CHECKPOINT_EVERY, quiet=True):
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.key = key
+        self.cross_key = cross_key
+        self.checkpoints = []
+        self.checkpoint_every = checkpoint_every  # None or 0 disables automatic checkpoints
+        self._rounds = 0
+        self._next_tx_id = 0
+        self._awaiting = {}  # Committed cross-shard tx_id -> shards that have not included it yet
+
+        # ✅ Each shard gets its own committee, sampled (reproducibly) from the full node set
+        rng = random.Random(seed)
+        committee_size = min(len(nodes), committee_size or max(3 * f + 1, len(nodes) // self.num_shards))
+        self.committees = [sorted(rng.sample(list(nodes), committee_size)) for _ in range(self.num_shards)]
+
+        self._conns = []
+        self._workers = []
+        for shard_id, committee in enumerate(self.committees):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_shard_worker, name=f"dag-shard-{shard_id}", daemon=True,
+                args=(child_conn, shard_id, committee, f, seed, block_size, max_pending, quiet),
+            )
+            worker.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn, worker in zip(self._conns, self._workers):
+            if worker.is_alive():
+                conn.send(("stop",))
+            worker.join(timeout=5)
+            conn.close()
+        self._conns, self._workers = [], []
+
+    def _call(self, commands):
+        """Send {shard_id: (command, *args)} to all shards at once, then gather the replies."""
+        for shard_id, message in commands.items():
+            self._conns[shard_id].send(message)
+        # ✅ Read every reply before raising, so no stale reply is left in a pipe for the next call
+        replies, errors = {}, {}
+        for shard_id in commands:
+            status, result = self._conns[shard_id].recv()
+            (replies if status == "ok" else errors)[shard_id] = result
+        if errors:
+            shard_id = next(iter(errors))
+            raise ShardError(shard_id, errors[shard_id])
+        return replies
+
+    def _record_landed(self, landed):
+        """Count cross-shard transactions that are now in a block on every shard they touch."""
+        included = 0
+        for tx_id in landed:
+            self._awaiting[tx_id] -= 1
+            if not self._awaiting[tx_id]:
+                del self._awaiting[tx_id]
+                included += 1
+        return included
+
+    def submit(self, transactions):
+        """
+        Route a batch of transactions to their shards and process them in parallel.
+
+        Single-shard transactions go straight to their shard; cross-shard ones
+        are committed on both shards or on neither. Returns counts of included,
+        rejected and parked (awaiting re-validation) transactions; of
+        cross-shard ones committed by the two-phase commit; of cross-shard
+        ones that reached a block on both shards during this call (including
+        ones committed earlier); and of those still waiting for one.
+        `cross_shard_aborted` lists the aborted cross-shard transactions
+        themselves (e.g. a shard under backpressure voted no), for the caller
+        to resubmit.
+        """
+        local = [[] for _ in range(self.num_shards)]
+        cross = []
+        for tx in transactions:
+            home = shard_for(self.key(tx), self.num_shards)
+            other_key = self.cross_key(tx) if self.cross_key else None
+            other = home if other_key is None else shard_for(other_key, self.num_shards)
+            if other == home:
+                local[home].append(tx)
+            else:
+                cross.append((tx, home, other, other_key))
+
+        results = self._call({s: ("submit", batch) for s, batch in enumerate(local)})
+        summary = {
+            "included": sum(included for included, _, _, _ in results.values()),
+            "rejected": sum(rejected for _, rejected, _, _ in results.values()),
+            "parked": sum(parked for _, _, parked, _ in results.values()),
+        }
+        cross_included = sum(self._record_landed(landed) for _, _, _, landed in results.values())
+        committed, aborted, landed = self._two_phase_commit(cross)
+        summary.update(
+            cross_shard_committed=committed,
+            cross_shard_aborted=aborted,
+            cross_shard_included=cross_included + self._record_landed(landed),
+            cross_shard_pending=len(self._awaiting),
+        )
+        self._rounds += 1
+        if self.checkpoint_every and self._rounds % self.checkpoint_every == 0:
+            self.checkpoint()
+        return summary
+
+    @staticmethod
+    def _waves(cross, key):
+        """
+        Split cross-shard entries into waves in which no key appears twice.
+
+        A key stays locked from prepare to commit, so a second transaction on
+        the same key in one round would be voted down. Each transaction goes
+        in the wave after the last one touching any of its keys, which keeps
+        transactions on a key in submission order.
+        """
+        waves, last_wave = [], {}
+        for entry in cross:
+            tx, _, _, other_key = entry
+            keys = (key(tx), other_key)
+            wave = max(last_wave.get(k, -1) for k in keys) + 1
+            for k in keys:
+                last_wave[k] = wave
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(entry)
+        return waves
+
+    def _two_phase_commit(self, cross):
+        """
+        Run every cross-shard transaction through 2PC, one wave of distinct keys at a time.
+
+        Returns (committed count, aborted transactions, tx_ids the shards included in a block meanwhile).
+        """
+        committed, aborted, landed = 0, [], []
+        for wave in self._waves(cross, self.key):
+            wave_committed, wave_aborted, wave_landed = self._prepare_and_decide(wave)
+            committed += wave_committed
+            aborted.extend(wave_aborted)
+            landed.extend(wave_landed)
+        return committed, aborted, landed
+
+    def _prepare_and_decide(self, cross):
+        """Prepare each transaction on both of its shards, then commit or abort it everywhere."""
+        proposals = {}
+        transactions = {}
+        participants = {}
+        for tx, home, other, other_key in cross:
+            tx_id = self._next_tx_id
+            self._next_tx_id += 1
+            participants[tx_id] = (home, other)
+            transactions[tx_id] = tx
+            proposals.setdefault(home, []).append((tx_id, tx, self.key(tx)))
+            proposals.setdefault(other, []).append((tx_id, tx, other_key))
+
+        votes = {}
+        for shard_votes in self._call({s: ("prepare", p) for s, p in proposals.items()}).values():
+            for tx_id, vote in shard_votes.items():
+                votes[tx_id] = votes.get(tx_id, True) and vote
+
+        decisions = {}
+        for tx_id, (home, other) in participants.items():
+            phase = "commit" if votes[tx_id] else "abort"
+            for shard_id in (home, other):
+                decisions.setdefault(shard_id, {"commit": [], "abort": []})[phase].append(tx_id)
+        self._call({s: ("abort", d["abort"]) for s, d in decisions.items() if d["abort"]})
+        self._awaiting.update((tx_id, 2) for tx_id, vote in votes.items() if vote)
+        replies = self._call({s: ("commit", d["commit"]) for s, d in decisions.items() if d["commit"]})
+
+        aborted = [transactions[tx_id] for tx_id, vote in votes.items() if not vote]
+        return len(votes) - len(aborted), aborted, [tx_id for landed in replies.values() for tx_id in landed]
+
+    def headers(self):
+        headers = self._call({s: ("header",) for s in range(self.num_shards)})
+        return [headers[s] for s in range(self.num_shards)]
+
+    def checkpoint(self):
+        """Merge the current shard headers into a global checkpoint chained to the previous one."""
+        headers = self.headers()
+        previous = self.checkpoints[-1]["hash"] if self.checkpoints else None
+        body = {"sequence": len(self.checkpoints), "previous": previous, "shards": headers}
+        checkpoint = dict(body, hash=hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest(),
+                          timestamp=time.time())
+        self.checkpoints.append(checkpoint)
+        print(f"[CHECKPOINT] ✅ #{checkpoint['sequence']} over {self.num_shards} shards: {checkpoint['hash'][:16]}")
+        return checkpoint
+
+
+def _run(transactions, num_shards, nodes, args):
+    """Push `transactions` through a fresh sharded chain; returns (elapsed seconds, summary totals)."""
+    totals = {}
+    with ShardedDAGBlockchain(nodes, num_shards, block_size=args.block_size, seed=args.seed) as chain:
+        start = time.perf_counter()
+        aborted = []
+        for i in range(0, len(transactions), args.batch_size):
+            summary = chain.submit(aborted + transactions[i:i + args.batch_size])  # ✅ Aborted ones go again
+            aborted = summary.pop("cross_shard_aborted")
+            for name, value in summary.items():
+                totals[name] = totals.get(name, 0) + value
+        elapsed = time.perf_counter() - start
+        totals["cross_shard_pending"] = chain.submit([])["cross_shard_pending"]
+        totals["cross_shard_aborted"] = len(aborted)  # Still aborted after the last round
+        chain.checkpoint()
+    return elapsed, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput run of the sharded DAG blockchain.")
+    parser.add_argument("--shards", default=str(os.cpu_count() or 1),
+                        help="Shard count, or a comma-separated sweep such as 1,2,4 (speedup is relative to the first).")
+    parser.add_argument("--nodes", type=int, default=16)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=2000, help="Transactions per coordinator round.")
+    parser.add_argument("--block-size", type=int, default=10, help="Transactions per block.")
+    parser.add_argument("--cross-shard", type=float, default=0.1, help="Fraction of cross-shard transactions.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    accounts = [f"acct{i}" for i in range(1000)]
+    transactions = []
+    for i in range(args.transactions):
+        sender = rng.choice(accounts)
+        receiver = rng.choice(accounts) if rng.random() < args.cross_shard else None
+        transactions.append({"id": i, "sender": sender, "receiver": receiver})
+
+    nodes = [f"Node{i}" for i in range(1, args.nodes + 1)]
+    shard_counts = [int(n) for n in args.shards.split(",")]
+    cores = os.cpu_count() or 1
+    if max(shard_counts) > cores:
+        print(f"[WARNING] Only {cores} CPU core(s): shards beyond that share a core and cannot add throughput.")
+
+    baseline = None
+    for num_shards in shard_counts:
+        elapsed, totals = _run(transactions, num_shards, nodes, args)
+        rate = args.transactions / elapsed
+        baseline = baseline or rate
+        print(f"[INFO] {args.transactions} transactions on {num_shards} shards in {elapsed:.2f}s "
+              f"({rate:.0f} tx/s, {rate / baseline:.2f}x): {totals}")
+
+
+if __name__ == "__main__":
+    main()
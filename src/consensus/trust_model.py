@@ -1,25 +1,28 @@
-import numpy as np
-import time
+import math
+import random
+from .clock import SYSTEM_CLOCK
 
 class TrustModel:
-    def __init__(self, nodes):
+    def __init__(self, nodes, clock=None, rng=None):
         """Initialize trust scores and proposal tracking for each node."""
-        self.trust_scores = {node: np.random.uniform(0.5, 1.0) for node in nodes}
-        self.last_activity = {node: time.time() for node in nodes}  # Track last activity for trust decay
+        self.clock = clock or SYSTEM_CLOCK  # ✅ Virtual clock in simulations, wall clock otherwise
+        self.rng = rng or random  # ✅ Seeded random.Random for reproducible runs
+        self.trust_scores = {node: self.rng.uniform(0.5, 1.0) for node in nodes}
+        self.last_activity = {node: self.clock.time() for node in nodes}  # Track last activity for trust decay
         self.misbehavior_count = {node: 0 for node in nodes}  # Track violations
         self.successful_proposals = {node: 0 for node in nodes}  # ✅ Track successful block proposals
         self.malicious_nodes = set()  # ✅ Maintain a list of blacklisted nodes
 
     def update_trust_score(self, node, successful_blocks, total_attempts):
         """Dynamically update trust scores based on successful participation and recovery logic."""
-        current_time = time.time()
+        current_time = self.clock.time()
 
         if total_attempts == 0:
             return  # Avoid division by zero
 
         success_ratio = successful_blocks / total_attempts
         time_since_last_block = current_time - self.last_activity.get(node, current_time)
-        decay_factor = np.exp(-0.02 * time_since_last_block)  # Slower decay
+        decay_factor = math.exp(-0.02 * time_since_last_block)  # Slower decay
 
         previous_trust = self.trust_scores.get(node, 0.5)
 
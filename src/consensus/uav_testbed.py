@@ -1,16 +1,136 @@
+import contextlib
+import os
 import random
 import time
+from collections import Counter
+from consensus.clock import SYSTEM_CLOCK, EventScheduler, VirtualClock
 from consensus.hybrid_consensus import UPBFT
-from consensus.dag_blockchain import DAGBlockchain
+from consensus.dag_blockchain import PARKED, DAGBlockchain
+from consensus.trust_model import TrustModel
+
+HOUR = 3600
 
 class UAVTestbed:
-    def __init__(self, num_uavs):
+    def __init__(self, num_uavs, f=1, seed=None, clock=None):
+        self.rng = random.Random(seed)  # ✅ One seeded RNG drives the whole run
+        self.clock = clock or SYSTEM_CLOCK
         self.uavs = [f"UAV_{i}" for i in range(1, num_uavs + 1)]
-        self.consensus = UPBFT(self.uavs, f=1)
+        self.trust_model = TrustModel(self.uavs, clock=self.clock, rng=self.rng)
+        self.consensus = UPBFT(list(self.uavs), f=f, trust_model=self.trust_model)  # consensus.nodes = reachable UAVs
         self.blockchain = DAGBlockchain(self.consensus)
+        self.offline = set()  # UAVs whose link is currently down
+        self.events = Counter()
+        self._next_uav_id = num_uavs + 1
+
+    @classmethod
+    def virtual(cls, num_uavs, seed=0, start_time=0.0, **kwargs):
+        """Testbed on a VirtualClock, ready for simulate_discrete_events."""
+        return cls(num_uavs, seed=seed, clock=VirtualClock(start_time), **kwargs)
 
-    def simulate_network(self):
+    def simulate_network(self, num_transactions=5000):
         """Simulate UAV blockchain transaction processing."""
-        for _ in range(5000):
-            leader = self.consensus.elect_leader()
-            self.blockchain.add_block(["Tx"], leader)
+        for _ in range(num_transactions):
+            leader = self.consensus.elect_leader(self.blockchain)
+            if leader:
+                self.blockchain.add_block(["Tx"], leader)
+
+    def simulate_discrete_events(self, duration, tx_rate=1.0, join_rate=1 / HOUR, leave_rate=1 / HOUR,
+                                 link_drop_rate=6 / HOUR, mean_link_downtime=60.0, verbose=False):
+        """
+        Simulate `duration` seconds of fleet operation in virtual time.
+
+        Transactions, UAV joins, UAV departures and link drops arrive as
+        Poisson processes (rates are per second); a dropped link comes back
+        after an exponentially distributed downtime. The clock jumps from
+        event to event, so the run takes as long as the work, not as long as
+        `duration`, and is fully determined by the seed.
+        """
+        if not isinstance(self.clock, VirtualClock):
+            raise TypeError("Discrete-event mode needs a VirtualClock; build the testbed with UAVTestbed.virtual().")
+
+        scheduler = EventScheduler(self.clock)
+        start = self.clock.time()
+        self._mean_link_downtime = mean_link_downtime
+        for rate, handler in ((tx_rate, self._on_transaction), (join_rate, self._on_join),
+                              (leave_rate, self._on_leave), (link_drop_rate, self._on_link_drop)):
+            if rate > 0:
+                scheduler.schedule(self.rng.expovariate(rate), self._arrival, scheduler, rate, handler)
+
+        wall_start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, \
+                (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)):
+            processed = scheduler.run(until=start + duration)
+
+        return {
+            "virtual_seconds": self.clock.time() - start,
+            "wall_seconds": round(time.perf_counter() - wall_start, 3),
+            "events_processed": processed,
+            "events": dict(self.events),
+            "blocks": len(self.blockchain.blocks),
+            "fleet_size": len(self.uavs),
+            "reachable_uavs": len(self.consensus.nodes),
+        }
+
+    def _arrival(self, scheduler, rate, handler):
+        """Run one arrival of a Poisson process and schedule the next one."""
+        handler(scheduler)
+        scheduler.schedule(self.rng.expovariate(rate), self._arrival, scheduler, rate, handler)
+
+    def _disconnect(self, uav):
+        self.consensus.nodes.remove(uav)
+        if self.consensus.leader == uav:
+            self.consensus.leader = None  # Force a new election
+
+    def _on_transaction(self, scheduler):
+        self.events["transaction"] += 1
+        leader = self.consensus.elect_leader(self.blockchain)
+        if leader is None:
+            self.events["election_failed"] += 1
+            return
+        block = self.blockchain.add_block([f"Tx_{self.events['transaction']}"], leader,
+                                          on_commit=self._on_late_commit, on_drop=self._on_late_drop)
+        self.events["block_added" if block else "block_parked" if block is PARKED else "block_rejected"] += 1
+
+    def _on_late_commit(self, block):
+        self.events["block_added_after_retry"] += 1
+
+    def _on_late_drop(self, block):
+        self.events["block_rejected_after_retry"] += 1
+
+    def _on_join(self, scheduler):
+        uav = f"UAV_{self._next_uav_id}"
+        self._next_uav_id += 1
+        self.uavs.append(uav)
+        self.consensus.nodes.append(uav)
+        self.consensus.node_scores[uav] = self.rng.uniform(0, 1)
+        self.trust_model.trust_scores[uav] = self.rng.uniform(0.5, 1.0)
+        self.trust_model.last_activity[uav] = self.clock.time()
+        self.trust_model.misbehavior_count[uav] = 0
+        self.trust_model.successful_proposals[uav] = 0
+        self.events["join"] += 1
+
+    def _on_leave(self, scheduler):
+        if len(self.uavs) <= 1:
+            return
+        uav = self.rng.choice(self.uavs)
+        self.uavs.remove(uav)
+        if uav in self.offline:
+            self.offline.discard(uav)
+        else:
+            self._disconnect(uav)
+        self.events["leave"] += 1
+
+    def _on_link_drop(self, scheduler):
+        if len(self.consensus.nodes) <= 1:
+            return
+        uav = self.rng.choice(self.consensus.nodes)
+        self._disconnect(uav)
+        self.offline.add(uav)
+        self.events["link_drop"] += 1
+        scheduler.schedule(self.rng.expovariate(1 / self._mean_link_downtime), self._on_link_restore, uav)
+
+    def _on_link_restore(self, uav):
+        if uav in self.offline:  # Not if the UAV left the fleet meanwhile
+            self.offline.discard(uav)
+            self.consensus.nodes.append(uav)
+            self.events["link_restore"] += 1
@@ -0,0 +1,133 @@
+"""Server-side feature store for fraud scoring.
+
+Per-sender activity is kept in small ring buffers of time buckets, so the
+rolling "transactions in the past week" count is updated and read in O(1).
+Addresses are encoded with a stable hash, which needs no per-address state
+and gives the same code in training, in every worker process and across
+restarts. Memory is bounded by `max_senders`; idle senders are evicted in
+least-recently-active order.
+"""
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+
+DAY = 86400
+WEEK = 7 * DAY
+ENCODER_BUCKETS = 1 << 16
+
+
+class AddressEncoder:
+    """Stable categorical encoder: CRC32 of the normalized address, modulo `buckets`."""
+
+    def __init__(self, buckets=ENCODER_BUCKETS):
+        self.buckets = buckets
+
+    def encode(self, address):
+        return zlib.crc32(str(address).strip().lower().encode()) % self.buckets
+
+
+class _SenderWindow:
+    __slots__ = ("last_bucket", "last_seen", "total", "counts")
+
+    def __init__(self, bucket, num_buckets):
+        self.last_bucket = bucket
+        self.last_seen = 0.0
+        self.total = 0
+        self.counts = array("I", bytes(4 * num_buckets))
+
+
+class SenderFeatureStore:
+    """Rolling per-sender transaction counts plus address encoding."""
+
+    def __init__(self, window_seconds=WEEK, num_buckets=7, max_senders=500_000,
+                 encoder=None, evict_every=1024):
+        self.bucket_seconds = window_seconds / num_buckets
+        self.window_seconds = window_seconds
+        self.num_buckets = num_buckets
+        self.max_senders = max_senders
+        self.encoder = encoder or AddressEncoder()
+        self.evict_every = evict_every
+        self._senders = OrderedDict()  # Least recently active first
+        self._records_since_eviction = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._senders)
+
+    def _advance(self, window, bucket):
+        """Expire buckets that slid out of the window; at most `num_buckets` steps."""
+        gap = bucket - window.last_bucket
+        if gap <= 0:
+            return
+        counts = window.counts
+        if gap >= self.num_buckets:
+            for i in range(self.num_buckets):
+                counts[i] = 0
+            window.total = 0
+        else:
+            for b in range(window.last_bucket + 1, bucket + 1):
+                i = b % self.num_buckets
+                window.total -= counts[i]
+                counts[i] = 0
+        window.last_bucket = bucket
+
+    def count(self, sender, timestamp=None):
+        """Transactions recorded for `sender` within the window ending at `timestamp`."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            window = self._senders.get(sender)
+            if window is None:
+                return 0
+            self._advance(window, int(timestamp // self.bucket_seconds))
+            return window.total
+
+    def record(self, sender, timestamp=None):
+        """Record one accepted transaction from `sender`."""
+        timestamp = time.time() if timestamp is None else timestamp
+        bucket = int(timestamp // self.bucket_seconds)
+        with self._lock:
+            window = self._senders.get(sender)
+            if window is None:
+                window = self._senders[sender] = _SenderWindow(bucket, self.num_buckets)
+            else:
+                self._senders.move_to_end(sender)
+
+            self._advance(window, bucket)
+            if bucket > window.last_bucket - self.num_buckets:  # Late events still inside the window count
+                window.counts[bucket % self.num_buckets] += 1
+                window.total += 1
+            window.last_seen = max(window.last_seen, timestamp)
+
+            if len(self._senders) > self.max_senders:
+                self._senders.popitem(last=False)
+            self._records_since_eviction += 1
+            if self._records_since_eviction >= self.evict_every:
+                self._records_since_eviction = 0
+                self._evict_idle(timestamp)
+
+    def _evict_idle(self, now):
+        cutoff = now - self.window_seconds
+        senders = self._senders
+        while senders:
+            sender, window = next(iter(senders.items()))
+            if window.last_seen >= cutoff:
+                break
+            senders.popitem(last=False)
+
+    def evict_idle(self, now=None):
+        """Drop senders with no activity inside the window; amortized O(1) per record."""
+        with self._lock:
+            self._evict_idle(time.time() if now is None else now)
+
+    def features(self, sender, receiver, amount, timestamp=None):
+        """Model feature vector, in the order used by train.FEATURES."""
+        timestamp = time.time() if timestamp is None else timestamp
+        return [
+            float(amount),
+            int(timestamp) % DAY,  # Transaction time in seconds of the (UTC) day
+            self.count(sender, timestamp),
+            self.encoder.encode(sender),
+            self.encoder.encode(receiver),
+        ]
@@ -2,15 +2,20 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from flask import Flask, request, jsonify
-from consensus.hybrid_consensus import DAGBlockchain, UPBFT
+from flask import Flask, Response, request, jsonify
+from consensus.hybrid_consensus import UPBFT
+from consensus.dag_blockchain import PARKED, DAGBlockchain
+from consensus.trust_model import TrustModel
+from consensus.instrumentation import metrics, PROMETHEUS_CONTENT_TYPE
 import hashlib
 
 app = Flask(__name__)
 
 # Initialize Blockchain and Consensus Mechanism
-blockchain = DAGBlockchain()
-consensus = UPBFT(nodes=["Node1", "Node2", "Node3", "Node4"], f=1)
+trust_model = TrustModel(nodes=["Node1", "Node2", "Node3", "Node4"])
+consensus = UPBFT(nodes=["Node1", "Node2", "Node3", "Node4"], f=1, trust_model=trust_model)
+blockchain = DAGBlockchain(consensus=consensus)
+blockchain.start_retry_timer()  # ✅ Parked blocks settle even when no new transaction arrives
 
 @app.route("/submit_transaction", methods=["POST"])
 def submit_transaction():
@@ -23,11 +28,14 @@ def submit_transaction():
     pre_prepared_msg = consensus.pre_prepare(transaction)
     prepared_msg = consensus.prepare(pre_prepared_msg)
     
-    if consensus.commit(prepared_msg):
-        block = blockchain.add_block([transaction])
-        return jsonify({"message": "Transaction committed", "block_hash": block.hash}), 200
-    else:
-        return jsonify({"error": "Transaction failed consensus"}), 500
+    proposer = consensus.elect_leader(blockchain)
+    if proposer and consensus.commit(prepared_msg):
+        block = blockchain.add_block([transaction], proposer)
+        if block is PARKED:  # Re-validated later; resubmitting would duplicate it
+            return jsonify({"message": "Transaction queued for re-validation"}), 202
+        if block:
+            return jsonify({"message": "Transaction committed", "block_hash": block.hash}), 200
+    return jsonify({"error": "Transaction failed consensus"}), 500
 
 @app.route("/get_blockchain", methods=["GET"])
 def get_blockchain():
@@ -55,6 +63,10 @@ def get_dag_structure():
 def performance_metrics():
     return jsonify(consensus.get_performance_metrics()), 200
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
 
@@ -1,23 +1,19 @@
-import json
-from web3 import Web3
-import joblib
 import numpy as np
+from feature_store import AddressEncoder
+from model_registry import ModelRegistry
+from onchain.client import get_client
 
-# Connect to Hardhat blockchain
-web3 = Web3(Web3.HTTPProvider("http://127.0.0.1:8545"))
-
-# Load ABI from compiled contract JSON
-with open("artifacts/contracts/TransactionStorage.sol/TransactionStorage.json", "r") as f:
-    contract_json = json.load(f)
-    contract_abi = contract_json["abi"]  # ✅ Correct way to load ABI
+# Connect to Hardhat blockchain through the shared pooled client
+client = get_client("http://127.0.0.1:8545")
+web3 = client.web3
 
 # Smart contract details
 contract_address = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"  # Replace with actual deployed address
 
-contract = web3.eth.contract(address=contract_address, abi=contract_abi)
+contract = client.contract("TransactionStorage", contract_address)
 
-# Load trained fraud detection model
-model = joblib.load("fraud_detection_model.pkl")
+# Load the active fraud detection model from the registry
+model = ModelRegistry().current()
 
 # Simulate a transaction
 transaction_id = 4
@@ -26,8 +22,9 @@ receiver = "0x456"
 amount = 10000
 transaction_time = 45000
 num_transactions_past_week = 5
-sender_encoded = 3
-receiver_encoded = 7
+encoder = AddressEncoder()  # Same stable encoding as training and the API
+sender_encoded = encoder.encode(sender)
+receiver_encoded = encoder.encode(receiver)
 
 # Prepare data for model prediction
 features = np.array([[amount, transaction_time, num_transactions_past_week, sender_encoded, receiver_encoded]])
@@ -0,0 +1,174 @@
+"""Versioned registry of NumPy-only fraud scorers.
+
+Trained scikit-learn models are exported to their bare weights and intercept
+(with any StandardScaler folded in), so inference is a single dot product.
+Publishing a new version flips an atomic `CURRENT` pointer file; serving
+processes notice it on their next poll and swap the scorer reference without
+restarting; requests never wait on a reload once a scorer is being served.
+"""
+import json
+import os
+import threading
+import time
+import numpy as np
+
+REGISTRY_DIR = "models/fraud_detection"
+LEGACY_MODEL_PATH = "fraud_detection_model.pkl"
+POINTER_FILE = "CURRENT"
+
+
+class LinearScorer:
+    """Logistic-regression scorer backed by a weight vector and an intercept."""
+    __slots__ = ("weights", "intercept", "classes", "version", "metadata")
+
+    def __init__(self, weights, intercept, classes=(0, 1), version=None, metadata=None):
+        self.weights = np.asarray(weights, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.classes = np.asarray(classes)
+        self.version = version
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_estimator(cls, model, **kwargs):
+        """Export a fitted linear classifier, or a Pipeline of StandardScalers ending in one."""
+        steps = [step for _, step in model.steps] if hasattr(model, "steps") else [model]
+        *transforms, clf = steps
+        if clf.coef_.shape[0] != 1:
+            raise ValueError("Only binary linear classifiers can be exported to a LinearScorer.")
+
+        weights = clf.coef_[0].astype(np.float64)
+        intercept = float(clf.intercept_[0])
+        # Fold scalers in from the classifier outwards: w.((x - mean) / scale) + b
+        for transform in reversed(transforms):
+            if type(transform).__name__ != "StandardScaler":
+                raise ValueError(f"Cannot fold {type(transform).__name__} into a LinearScorer.")
+            scale = transform.scale_ if transform.scale_ is not None else 1.0
+            mean = transform.mean_ if transform.mean_ is not None else 0.0
+            weights = weights / scale
+            intercept -= float(np.sum(weights * mean))
+        return cls(weights, intercept, clf.classes_, **kwargs)
+
+    def decision_function(self, features):
+        return np.asarray(features, dtype=np.float64) @ self.weights + self.intercept
+
+    def predict_proba(self, features):
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(features)))
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, features):
+        return self.classes[(self.decision_function(features) > 0).astype(np.intp)]
+
+
+class ModelRegistry:
+    """Directory of versioned scorers (`v0001.npz` + `v0001.json`) with a `CURRENT` pointer."""
+
+    def __init__(self, root=REGISTRY_DIR, poll_interval=2.0, legacy_model_path=LEGACY_MODEL_PATH):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.legacy_model_path = legacy_model_path
+        self._active = None
+        self._next_check = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _atomic_write(self, name, write):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._path(f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(name))
+
+    def versions(self):
+        """Return published version numbers in ascending order."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name[1:-4]) for name in os.listdir(self.root)
+                      if name.startswith("v") and name.endswith(".npz"))
+
+    def active_version(self):
+        """Version the `CURRENT` pointer refers to, or None for an empty registry."""
+        try:
+            with open(self._path(POINTER_FILE), "r") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def publish(self, model, metadata=None, activate=True):
+        """Export `model` (scikit-learn estimator or LinearScorer) as the next version."""
+        scorer = model if isinstance(model, LinearScorer) else LinearScorer.from_estimator(model)
+        version = (self.versions() or [0])[-1] + 1
+        metadata = dict(metadata or {}, version=version, published_at=time.time())
+
+        # Write the payload first; the pointer only ever refers to complete files
+        self._atomic_write(f"v{version:04d}.json", lambda f: f.write(json.dumps(metadata, indent=2).encode()))
+        self._atomic_write(f"v{version:04d}.npz", lambda f: np.savez(
+            f, weights=scorer.weights, intercept=np.array([scorer.intercept]), classes=scorer.classes))
+        if activate:
+            self.activate(version)
+        print(f"[MODEL REGISTRY] ✅ Published model version {version}{' (active)' if activate else ''}.")
+        return version
+
+    def activate(self, version):
+        """Point `CURRENT` at `version` (also used for rollbacks)."""
+        if version not in self.versions():
+            raise ValueError(f"Model version {version} is not published in {self.root}")
+        self._atomic_write(POINTER_FILE, lambda f: f.write(str(version).encode()))
+        self._next_check = 0.0
+
+    def load(self, version):
+        with np.load(self._path(f"v{version:04d}.npz")) as data:
+            weights, intercept, classes = data["weights"], data["intercept"][0], data["classes"]
+        try:
+            with open(self._path(f"v{version:04d}.json"), "r") as f:
+                metadata = json.load(f)
+        except FileNotFoundError:
+            metadata = {}
+        return LinearScorer(weights, intercept, classes, version=version, metadata=metadata)
+
+    def import_legacy_model(self):
+        """Publish the joblib-pickled model so registries start non-empty."""
+        import joblib  # Only needed for this one-off conversion
+        model = joblib.load(self.legacy_model_path)
+        return self.publish(model, metadata={"source": self.legacy_model_path})
+
+    def _refresh(self):
+        """Re-read the pointer and load the version it names if it changed (caller holds the lock)."""
+        version = self.active_version()
+        if version is None and self._active is None and os.path.exists(self.legacy_model_path):
+            version = self.import_legacy_model()
+        active = self._active
+        if version is not None and (active is None or active.version != version):
+            self._active = self.load(version)
+            print(f"[MODEL REGISTRY] 🔄 Serving model version {version}.")
+        # Only advanced once the load is done, so no caller sees a "checked" registry without a scorer
+        self._next_check = time.monotonic() + self.poll_interval
+
+    def current(self, refresh=False):
+        """
+        Return the active scorer, or None if no model is published.
+
+        The first load is synchronous: concurrent callers wait for it rather
+        than seeing None. Afterwards, at most once per `poll_interval`, one
+        caller re-reads the pointer file and swaps in a new version with a
+        single reference assignment while the others keep serving the
+        previous scorer; a failed reload also keeps the previous scorer.
+        """
+        if self._active is None or refresh:
+            with self._refresh_lock:
+                if refresh or (self._active is None and time.monotonic() >= self._next_check):
+                    self._refresh()
+            return self._active
+
+        if time.monotonic() >= self._next_check and self._refresh_lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            except Exception as e:
+                self._next_check = time.monotonic() + self.poll_interval
+                print(f"[MODEL REGISTRY] ⚠️ Reload failed, still serving version {self._active.version}: {e}")
+            finally:
+                self._refresh_lock.release()
+        return self._active
@@ -0,0 +1,206 @@
+"""Shared JSON-RPC client for on-chain reads.
+
+One pooled `requests.Session` per node URL is shared by every caller in the
+process. Contract reads are ABI-encoded locally and sent as JSON-RPC batch
+requests, so N view calls cost one HTTP round-trip, and results are kept in a
+short-TTL cache. A Web3 instance bound to the same session is available for
+writes and everything else.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+DEFAULT_RPC_URL = "http://127.0.0.1:8545"
+
+ARTIFACTS = {
+    "EnhancedConsensus": "artifacts/contracts/EnhancedConsensus.sol/EnhancedConsensus.json",
+    "TransactionStorage": "artifacts/contracts/TransactionStorage.sol/TransactionStorage.json",
+}
+
+
+def load_abi(contract_name):
+    """Load the ABI from the compiled contract JSON."""
+    with open(ARTIFACTS[contract_name], "r") as f:
+        return json.load(f)["abi"]
+
+
+class RpcError(Exception):
+    """A JSON-RPC request returned an error object."""
+
+    def __init__(self, method, error):
+        super().__init__(f"{method} failed: {error.get('message', error)}")
+        self.method = method
+        self.error = error
+
+
+class TTLCache:
+    """Thread-safe LRU cache of at most `max_entries`, whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_MISSING = object()
+
+
+def _normalize(abi_type, value):
+    """Checksum decoded addresses and turn dynamic arrays into lists."""
+    from web3 import Web3
+
+    if abi_type == "address":
+        return Web3.to_checksum_address(value)
+    if abi_type.endswith("[]"):
+        return [_normalize(abi_type[:-2], v) for v in value]
+    return value
+
+
+class RpcClient:
+    """Pooled, batching JSON-RPC client with a short-TTL read cache."""
+
+    def __init__(self, rpc_url=DEFAULT_RPC_URL, pool_size=32, timeout=10.0, cache_ttl=2.0, max_batch_size=500,
+                 cache_size=10_000):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.cache = TTLCache(cache_ttl, max_entries=cache_size)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._request_id = 0
+        self._id_lock = threading.Lock()
+        self._web3 = None
+        self._contracts = {}
+
+    @property
+    def web3(self):
+        """Web3 instance sharing this client's HTTP session (created on first use)."""
+        if self._web3 is None:
+            from web3 import Web3
+            self._web3 = Web3(Web3.HTTPProvider(self.rpc_url, session=self.session,
+                                                request_kwargs={"timeout": self.timeout}))
+        return self._web3
+
+    def contract(self, contract_name, address):
+        """Bound contract object for a compiled artifact, cached per address."""
+        key = (contract_name, address.lower())
+        if key not in self._contracts:
+            from web3 import Web3
+            self._contracts[key] = self.web3.eth.contract(
+                address=Web3.to_checksum_address(address), abi=load_abi(contract_name))
+        return self._contracts[key]
+
+    def _next_ids(self, n):
+        with self._id_lock:
+            first = self._request_id
+            self._request_id += n
+        return range(first, first + n)
+
+    def _post(self, payload):
+        response = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def request(self, method, params=()):
+        """Single JSON-RPC call."""
+        (request_id,) = self._next_ids(1)
+        reply = self._post({"jsonrpc": "2.0", "id": request_id, "method": method, "params": list(params)})
+        if "error" in reply:
+            raise RpcError(method, reply["error"])
+        return reply["result"]
+
+    def batch(self, calls):
+        """
+        Send [(method, params), ...] as JSON-RPC batches (one round-trip per
+        `max_batch_size` calls) and return the results in call order.
+        """
+        results = []
+        for start in range(0, len(calls), self.max_batch_size):
+            chunk = calls[start:start + self.max_batch_size]
+            ids = self._next_ids(len(chunk))
+            replies = self._post([
+                {"jsonrpc": "2.0", "id": request_id, "method": method, "params": list(params)}
+                for request_id, (method, params) in zip(ids, chunk)
+            ])
+            by_id = {reply["id"]: reply for reply in replies}  # Servers may reorder batch replies
+            for request_id, (method, _) in zip(ids, chunk):
+                reply = by_id[request_id]
+                if "error" in reply:
+                    raise RpcError(method, reply["error"])
+                results.append(reply["result"])
+        return results
+
+    def read_many(self, reads, block="latest", use_cache=True):
+        """
+        Execute view calls [(contract, function_name, args), ...] in one batch.
+
+        Calls are ABI-encoded locally and sent as eth_call; cached results
+        younger than the TTL are served without touching the node.
+        """
+        from eth_abi import decode
+        from web3 import Web3
+
+        results = [_MISSING] * len(reads)
+        misses = []
+        for i, (contract, fn_name, args) in enumerate(reads):
+            key = (contract.address, fn_name, json.dumps(list(args), default=str), block)  # Array args are unhashable
+            if use_cache:
+                results[i] = self.cache.get(key, _MISSING)
+            if results[i] is _MISSING:
+                misses.append((i, key, contract, fn_name, args))
+
+        if misses:
+            raw = self.batch([
+                ("eth_call", [{"to": contract.address, "data": contract.encode_abi(fn_name, args=list(args))}, block])
+                for _, _, contract, fn_name, args in misses
+            ])
+            for (i, key, contract, fn_name, _), data in zip(misses, raw):
+                types = [o["type"] for o in contract.get_function_by_name(fn_name).abi["outputs"]]
+                decoded = [_normalize(t, v) for t, v in zip(types, decode(types, Web3.to_bytes(hexstr=data)))]
+                value = decoded[0] if len(decoded) == 1 else tuple(decoded)
+                self.cache.set(key, value)
+                results[i] = value
+        return results
+
+    def read(self, contract, fn_name, *args, block="latest", use_cache=True):
+        """Single cached view call."""
+        return self.read_many([(contract, fn_name, args)], block=block, use_cache=use_cache)[0]
+
+
+@lru_cache(maxsize=None)
+def get_client(rpc_url=DEFAULT_RPC_URL):
+    """Process-wide shared client per node URL."""
+    return RpcClient(rpc_url)
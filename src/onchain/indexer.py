@@ -0,0 +1,270 @@
+"""Local SQLite index of EnhancedConsensus and TransactionStorage events.
+
+Logs are pulled from the node with eth_getLogs in bulk block ranges, decoded
+against the compiled ABIs and written to SQLite together with a checkpoint,
+in one transaction, so the indexer can be stopped and resumed at any point.
+Dashboards and the Flask service query the index instead of the node.
+
+    python -m onchain.indexer --consensus-address 0x... --db events.db
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from .client import DEFAULT_RPC_URL, get_client, load_abi
+
+STORAGE_ADDRESS = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"
+EVENT_DB = "events.db"
+
+# Argument holding the "account" of each event, for per-address queries
+ACCOUNT_ARGS = ("sender", "validator", "newLeader")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT NOT NULL,
+    tx_id INTEGER,
+    account TEXT COLLATE NOCASE,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_events_tx ON events (contract, tx_id);
+CREATE INDEX IF NOT EXISTS idx_events_event ON events (event, block_number);
+CREATE INDEX IF NOT EXISTS idx_events_account ON events (account);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+class EventStore:
+    """SQLite-backed event index with the query API used by dashboards and the API."""
+
+    def __init__(self, path=EVENT_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the indexer
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def checkpoint(self, name):
+        """Last fully indexed block for `name`, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_block FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return row["last_block"] if row else None
+
+    def write_batch(self, rows, name, last_block):
+        """Insert decoded events and advance the checkpoint atomically (idempotent on replay)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO events (block_number, log_index, tx_hash, contract, address, event, "
+                "tx_id, account, args) VALUES (:block_number, :log_index, :tx_hash, :contract, :address, "
+                ":event, :tx_id, :account, :args)",
+                rows,
+            )
+            self._conn.execute(
+                "INSERT INTO checkpoints (name, last_block, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_block = excluded.last_block, updated_at = excluded.updated_at",
+                (name, last_block, time.time()),
+            )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, args=json.loads(row["args"])) if "args" in row.keys() else dict(row) for row in rows]
+
+    def events(self, event=None, contract=None, tx_id=None, account=None, from_block=None, limit=100):
+        """Most recent events first, filtered by any combination of the arguments."""
+        clauses, params = [], []
+        for column, value in (("event", event), ("contract", contract), ("tx_id", tx_id), ("account", account)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if from_block is not None:
+            clauses.append("block_number >= ?")
+            params.append(from_block)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        return self._query(
+            f"SELECT * FROM events {where} ORDER BY block_number DESC, log_index DESC LIMIT ?", params)
+
+    def transaction_status(self, tx_id, contract="EnhancedConsensus"):
+        """Lifecycle of one transaction reconstructed from its events, or None if unseen."""
+        history = self._query(
+            "SELECT * FROM events WHERE contract = ? AND tx_id = ? ORDER BY block_number, log_index",
+            (contract, tx_id))
+        if not history:
+            return None
+        added = next((e for e in history if e["event"] == "TransactionAdded"), None)
+        return {
+            "id": tx_id,
+            "contract": contract,
+            "added": added is not None,
+            "sender": added["args"].get("sender") if added else None,
+            "receiver": added["args"].get("receiver") if added else None,
+            "approvals": [e["args"]["validator"] for e in history if e["event"] == "TransactionApproved"],
+            "committed": any(e["event"] == "TransactionCommitted" for e in history),
+            "fraudulent": any(e["event"] in ("FraudFlagged", "TransactionFlagged") for e in history)
+                          or bool(added and added["args"].get("isFraudulent")),
+            "last_block": history[-1]["block_number"],
+        }
+
+    def leader_history(self, limit=100):
+        rows = self.events(event="LeaderRotated", contract="EnhancedConsensus", limit=limit)
+        return [{"leader": row["account"], "block_number": row["block_number"]} for row in rows]
+
+    def fraud_counts(self):
+        """Flagged transactions per sender (EnhancedConsensus)."""
+        return {row["account"]: row["flagged"] for row in self._query(
+            "SELECT added.account AS account, COUNT(*) AS flagged FROM events flagged "
+            "JOIN events added ON added.contract = flagged.contract AND added.tx_id = flagged.tx_id "
+            "AND added.event = 'TransactionAdded' "
+            "WHERE flagged.contract = 'EnhancedConsensus' AND flagged.event = 'FraudFlagged' "
+            "GROUP BY added.account")}
+
+    def event_counts(self):
+        return {f'{row["contract"]}.{row["event"]}': row["n"] for row in self._query(
+            "SELECT contract, event, COUNT(*) AS n FROM events GROUP BY contract, event")}
+
+
+class EventIndexer:
+    """Pulls contract logs in bulk block ranges into an EventStore, resuming from its checkpoint."""
+
+    def __init__(self, web3, store, addresses, name="default", start_block=0, batch_size=2000, confirmations=0):
+        """`addresses` maps a contract name from client.ARTIFACTS to its deployed address."""
+        from web3 import Web3
+
+        self.web3 = web3
+        self.store = store
+        self.name = name
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.max_batch_size = batch_size
+        self.confirmations = confirmations
+
+        # (address, topic0) -> (contract name, bound event) for decoding
+        self._events = {}
+        self.addresses = []
+        for contract_name, address in addresses.items():
+            address = Web3.to_checksum_address(address)
+            contract = web3.eth.contract(address=address, abi=load_abi(contract_name))
+            self.addresses.append(address)
+            for abi in contract.abi:
+                if abi["type"] != "event":
+                    continue
+                signature = f"{abi['name']}({','.join(i['type'] for i in abi['inputs'])})"
+                topic = Web3.to_hex(Web3.keccak(text=signature))
+                self._events[(address, topic)] = (contract_name, contract.events[abi["name"]]())
+        self.topics = sorted({topic for _, topic in self._events})
+
+    def _decode(self, log):
+        from web3 import Web3
+
+        key = (log["address"], Web3.to_hex(log["topics"][0]))
+        if key not in self._events:
+            return None
+        contract_name, event = self._events[key]
+        decoded = event.process_log(log)
+        args = {key: _jsonable(value) for key, value in decoded["args"].items()}
+        tx_id = args.get("id")
+        return {
+            "block_number": log["blockNumber"],
+            "log_index": log["logIndex"],
+            "tx_hash": Web3.to_hex(log["transactionHash"]),
+            "contract": contract_name,
+            "address": log["address"],
+            "event": decoded["event"],
+            "tx_id": tx_id if isinstance(tx_id, int) and tx_id < 2 ** 63 else None,
+            "account": next((args[key] for key in ACCOUNT_ARGS if key in args), None),
+            "args": json.dumps(args),
+        }
+
+    def sync_once(self):
+        """Index every confirmed block after the checkpoint; returns the number of new events."""
+        head = self.web3.eth.block_number - self.confirmations
+        last = self.store.checkpoint(self.name)
+        start = self.start_block if last is None else last + 1
+        indexed = 0
+
+        while start <= head:
+            end = min(start + self.batch_size - 1, head)
+            try:
+                logs = self.web3.eth.get_logs({
+                    "fromBlock": start, "toBlock": end,
+                    "address": self.addresses, "topics": [self.topics],
+                })
+            except Exception as exc:  # Providers cap range/result size; shrink the range and retry
+                if self.batch_size == 1:
+                    raise
+                self.batch_size = max(1, self.batch_size // 2)
+                print(f"[INDEXER] ⚠️ get_logs {start}-{end} failed ({exc}); batch size -> {self.batch_size}")
+                continue
+
+            rows = [row for row in map(self._decode, logs) if row is not None]
+            self.store.write_batch(rows, self.name, end)
+            indexed += len(rows)
+            start = end + 1
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+        if indexed:
+            print(f"[INDEXER] ✅ Indexed {indexed} events up to block {head}.")
+        return indexed
+
+    def run(self, poll_interval=2.0):
+        """Follow the chain head forever."""
+        while True:
+            self.sync_once()
+            time.sleep(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index contract events into SQLite.")
+    parser.add_argument("--rpc", default=DEFAULT_RPC_URL)
+    parser.add_argument("--db", default=EVENT_DB)
+    parser.add_argument("--consensus-address", help="Deployed EnhancedConsensus address.")
+    parser.add_argument("--storage-address", default=STORAGE_ADDRESS, help="Deployed TransactionStorage address.")
+    parser.add_argument("--name", default="default", help="Checkpoint name (one per contract set).")
+    parser.add_argument("--start-block", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--confirmations", type=int, default=0, help="Blocks to lag behind the head (reorg safety).")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--once", action="store_true", help="Catch up to the head and exit.")
+    args = parser.parse_args()
+
+    addresses = {"TransactionStorage": args.storage_address}
+    if args.consensus_address:
+        addresses["EnhancedConsensus"] = args.consensus_address
+
+    indexer = EventIndexer(
+        get_client(args.rpc).web3, EventStore(args.db), addresses, name=args.name,
+        start_block=args.start_block, batch_size=args.batch_size, confirmations=args.confirmations,
+    )
+    if args.once:
+        indexer.sync_once()
+    else:
+        indexer.run(args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Bulk sync of on-chain validator state into the Python TrustModel."""
+from .client import get_client
+
+VALIDATOR_FIELDS = ("getReputation", "energyScore", "fraudCount")
+
+
+def fetch_validator_states(contract, client=None):
+    """
+    Read reputation, energy score and fraud count for every validator.
+
+    One call lists the validators; all 3N per-validator reads then go to the
+    node as a single JSON-RPC batch instead of 3N round-trips.
+    """
+    client = client or get_client()
+    validators = list(dict.fromkeys(client.read(contract, "getAllValidators")))  # Contract allows duplicates
+    values = client.read_many([(contract, fn, (address,)) for address in validators for fn in VALIDATOR_FIELDS])
+    n = len(VALIDATOR_FIELDS)
+    return {
+        address: dict(zip(("reputation", "energy_score", "fraud_count"), values[i * n:(i + 1) * n]))
+        for i, address in enumerate(validators)
+    }
+
+
+def sync_trust_model(trust_model, contract, client=None, node_for=None):
+    """
+    Fill `trust_model` from on-chain reputation.
+
+    Reputation is scaled into the model's [0.1, 1.0] trust range relative to
+    the best validator, fraud counts become misbehavior counts and validators
+    with zero reputation are blacklisted. `node_for` maps validator addresses
+    to consensus node names (addresses are used as-is by default).
+    """
+    states = fetch_validator_states(contract, client)
+    best = max((state["reputation"] for state in states.values()), default=0)
+
+    for address, state in states.items():
+        node = (node_for or {}).get(address, address)
+        trust = 0.1 + 0.9 * state["reputation"] / best if best else 0.5
+        trust_model.trust_scores[node] = trust
+        trust_model.misbehavior_count[node] = state["fraud_count"]
+        trust_model.successful_proposals.setdefault(node, 0)
+        trust_model.last_activity.setdefault(node, trust_model.clock.time())  # ✅ Virtual time in simulations
+        if state["reputation"] == 0 and state["fraud_count"] > 0:
+            trust_model.malicious_nodes.add(node)
+        else:
+            trust_model.malicious_nodes.discard(node)
+
+    print(f"[TRUST SYNC] ✅ Synced {len(states)} validators from chain.")
+    return states
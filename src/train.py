@@ -1,57 +1,306 @@
+"""Train the fraud detection model.
+
+    python train.py                                 # In-memory LogisticRegression (original flow)
+    python train.py --chunksize 100000              # Out-of-core, incremental SGD training
+    python train.py --update --data data/new.csv    # Update the saved model with new data only
+"""
+import argparse
+import warnings
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import accuracy_score, classification_report
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 import joblib
+from joblib import Parallel, delayed
+from feature_store import DAY, SenderFeatureStore
+from model_registry import REGISTRY_DIR, ModelRegistry
+
+DATA_PATH = "data/transactions.csv"
+MODEL_PATH = "fraud_detection_model.pkl"
+
+FEATURES = ['amount', 'transaction_time', 'num_transactions_past_week', 'sender_encoded', 'receiver_encoded']
+CLASSES = np.array([0, 1])
+
+# Explicit dtypes so chunks parse identically and without type inference
+# ("timestamp", in epoch seconds, is optional)
+DTYPES = {"sender": "object", "receiver": "object", "amount": "float64", "is_fraudulent": "int8",
+          "timestamp": "float64"}
+
+SEED = 42
+N_SPLITS = 5
+TEST_FOLD = 0  # Fold held out for evaluation, i.e. a 20% test split
+
+
+def read_transactions(data_path, **kwargs):
+    return pd.read_csv(data_path, usecols=lambda column: column in DTYPES, dtype=DTYPES, **kwargs)
+
+
+def add_features(df, rng, store):
+    """
+    Add new transaction-related features, the same way the API computes them.
+
+    Rows must be in time order (see `ensure_time_order`): `store` is replayed
+    so each transaction sees only the sender's earlier non-fraudulent (i.e.
+    accepted) transactions.
+    """
+    if 'timestamp' in df:
+        timestamps = df['timestamp'].to_numpy()
+        past_week = np.empty(len(df), dtype=np.int64)
+        for i, (sender, ts, fraud) in enumerate(zip(df['sender'], timestamps, df['is_fraudulent'])):
+            past_week[i] = store.count(sender, ts)
+            if not fraud:
+                store.record(sender, ts)
+        df['transaction_time'] = timestamps.astype(np.int64) % DAY  # Transaction time in seconds
+        df['num_transactions_past_week'] = past_week
+    else:
+        warnings.warn("No timestamp column; using random transaction times and counts.")
+        df['transaction_time'] = rng.integers(0, DAY, df.shape[0])
+        df['num_transactions_past_week'] = rng.integers(1, 20, df.shape[0])
+    df['sender_encoded'] = df['sender'].map(store.encoder.encode)
+    df['receiver_encoded'] = df['receiver'].map(store.encoder.encode)
+    return df
+
+
+def ensure_time_order(timestamps, previous=-np.inf, where="data"):
+    """
+    Raise if `timestamps` (following `previous`) ever go backwards.
+
+    Replaying an unsorted file would count a sender's later transactions in
+    num_transactions_past_week, leaking future data into training.
+    """
+    if len(timestamps) and (timestamps[0] < previous or np.any(np.diff(timestamps) < 0)):
+        raise ValueError(f"Timestamps go backwards in {where}; sort the file by timestamp "
+                         "(the in-memory mode does this itself).")
+    return timestamps[-1] if len(timestamps) else previous
+
+
+def balance(df, rng):
+    """Balance dataset by undersampling majority class."""
+    fraud = df[df['is_fraudulent'] == 1]
+    non_fraud = df[df['is_fraudulent'] == 0]
+    n = min(len(fraud), len(non_fraud))
+    return pd.concat([
+        fraud.sample(n, random_state=rng) if len(fraud) > n else fraud,
+        non_fraud.sample(n, random_state=rng) if len(non_fraud) > n else non_fraud,
+    ])
+
+
+# ---------------------------------------------------------------------------
+# In-memory training
+# ---------------------------------------------------------------------------
+
+def train_in_memory(data_path, cv_jobs=-1, run_cv=True):
+    """Train a LogisticRegression on the whole (undersampled) dataset held in memory."""
+    rng = np.random.default_rng(SEED)
+    df = read_transactions(data_path)
+    if 'timestamp' in df:
+        df = df.sort_values('timestamp', kind='stable', ignore_index=True)  # Sender history must replay in time order
+
+    # Check class balance
+    print("Original dataset class distribution:")
+    print(df['is_fraudulent'].value_counts())
+
+    # Features come first so sender history covers every transaction, not just the sample
+    df = add_features(df, rng, SenderFeatureStore())
+    df_balanced = balance(df, rng)
+    print("\nBalanced dataset class distribution:")
+    print(df_balanced['is_fraudulent'].value_counts())
+
+    # Prepare features and labels
+    X = df_balanced[FEATURES].values
+    y = df_balanced['is_fraudulent'].values
+
+    # Split data into train-test
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SEED, stratify=y)
+
+    # Use Logistic Regression to avoid overfitting
+    model = LogisticRegression(max_iter=500)
+    model.fit(X_train, y_train)
+
+    # Evaluate model
+    y_pred = model.predict(X_test)
+    print(f"\nModel Accuracy: {accuracy_score(y_test, y_pred):.2f}")
+    print("\nClassification Report:\n", classification_report(y_test, y_pred))
+
+    # Use cross-validation for better evaluation, one fold per worker
+    if run_cv:
+        cv = StratifiedKFold(n_splits=N_SPLITS, shuffle=True, random_state=SEED)
+        cross_val_scores = cross_val_score(model, X, y, cv=cv, n_jobs=cv_jobs)
+        print(f"\nCross-Validation Accuracy: {cross_val_scores.mean():.2f} ± {cross_val_scores.std():.2f}")
+
+    return model
+
+
+# ---------------------------------------------------------------------------
+# Out-of-core training
+# ---------------------------------------------------------------------------
+
+def prepared_chunks(data_path, chunksize):
+    """
+    Yield (X, y, folds) per CSV chunk.
+
+    Each chunk is featurized and balanced with an RNG seeded by its position,
+    and sender history is replayed from the start of the file, so every pass
+    (and every CV worker) sees exactly the same rows, features and folds.
+    """
+    store = SenderFeatureStore()
+    last_timestamp = -np.inf
+    for chunk_no, chunk in enumerate(read_transactions(data_path, chunksize=chunksize)):
+        if 'timestamp' in chunk:  # Chunks can't be sorted globally, so the file must already be
+            last_timestamp = ensure_time_order(chunk['timestamp'].to_numpy(), last_timestamp,
+                                               where=f"{data_path} (chunk {chunk_no})")
+        rng = np.random.default_rng([SEED, chunk_no])
+        chunk = balance(add_features(chunk, rng, store), rng)
+        if chunk.empty:
+            continue
+        X = chunk[FEATURES].to_numpy(dtype=np.float64)
+        y = chunk['is_fraudulent'].to_numpy()
+        yield X, y, rng.integers(0, N_SPLITS, len(y))
+
+
+def new_incremental_model():
+    """Scaler + logistic-loss SGD; both support partial_fit."""
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("clf", SGDClassifier(loss="log_loss", alpha=1e-4, random_state=SEED)),
+    ])
+
+
+def _init_classifier(clf, coef, intercept):
+    """Allocate SGD state and seed it with existing weights."""
+    # Zero features with a negligible sample weight: allocates state without learning anything
+    clf.partial_fit(np.zeros((2, len(FEATURES))), CLASSES, classes=CLASSES, sample_weight=np.full(2, 1e-12))
+    clf.coef_[:] = coef
+    clf.intercept_[:] = intercept
+
+
+def as_incremental(model, data_path, chunksize):
+    """
+    Return a partial-fit capable pipeline equivalent to `model`.
+
+    Legacy LogisticRegression models are converted by fitting a scaler on the
+    new data and folding it into the weights, so predictions are unchanged.
+    """
+    if isinstance(model, Pipeline) and hasattr(model.named_steps["clf"], "partial_fit"):
+        return model
+
+    pipeline = new_incremental_model()
+    scaler = pipeline.named_steps["scaler"]
+    for X, _, _ in prepared_chunks(data_path, chunksize):
+        scaler.partial_fit(X)
+    coef = model.coef_ * scaler.scale_
+    intercept = model.intercept_ + model.coef_ @ scaler.mean_
+    _init_classifier(pipeline.named_steps["clf"], coef, intercept)
+    print("[INFO] Converted legacy model to an incremental pipeline.")
+    return pipeline
+
+
+def fit_stream(model, data_path, chunksize, exclude_fold=None, epochs=1, fit_scaler=True):
+    """Train `model` chunk by chunk, skipping rows of `exclude_fold`."""
+    scaler, clf = model.named_steps["scaler"], model.named_steps["clf"]
+
+    if fit_scaler:
+        # First pass: feature statistics, so SGD sees standardized inputs from the start
+        for X, _, folds in prepared_chunks(data_path, chunksize):
+            mask = folds != exclude_fold
+            if mask.any():
+                scaler.partial_fit(X[mask])
+
+    for epoch in range(epochs):
+        for X, y, folds in prepared_chunks(data_path, chunksize):
+            mask = folds != exclude_fold
+            if mask.any():
+                clf.partial_fit(scaler.transform(X[mask]), y[mask], classes=CLASSES)
+    return model
+
+
+def predict_stream(model, data_path, chunksize, fold):
+    """Return (y_true, y_pred) for the rows of `fold`."""
+    y_true, y_pred = [], []
+    for X, y, folds in prepared_chunks(data_path, chunksize):
+        mask = folds == fold
+        if mask.any():
+            y_true.append(y[mask])
+            y_pred.append(model.predict(X[mask]))
+    if not y_true:
+        return np.array([], dtype=np.int8), np.array([], dtype=np.int8)
+    return np.concatenate(y_true), np.concatenate(y_pred)
+
+
+def _streaming_fold_score(data_path, chunksize, fold, epochs):
+    model = fit_stream(new_incremental_model(), data_path, chunksize, exclude_fold=fold, epochs=epochs)
+    y_true, y_pred = predict_stream(model, data_path, chunksize, fold)
+    return accuracy_score(y_true, y_pred)
+
 
-# Load dataset
-df = pd.read_csv("data/transactions.csv")
+def streaming_cross_validate(data_path, chunksize, epochs=1, n_jobs=-1):
+    """K-fold cross-validation over the stream; folds train in parallel worker processes."""
+    return np.array(Parallel(n_jobs=n_jobs)(
+        delayed(_streaming_fold_score)(data_path, chunksize, fold, epochs) for fold in range(N_SPLITS)
+    ))
 
-# Check class balance
-print("Original dataset class distribution:")
-print(df['is_fraudulent'].value_counts())
 
-# Balance dataset by undersampling majority class
-fraud = df[df['is_fraudulent'] == 1]
-non_fraud = df[df['is_fraudulent'] == 0].sample(len(fraud), random_state=42)
-df_balanced = pd.concat([fraud, non_fraud])
+def train_streaming(data_path, chunksize, epochs=1, base_model=None, cv_jobs=-1, run_cv=True):
+    """
+    Out-of-core training; memory is bounded by `chunksize` rather than the dataset.
 
-print("\nBalanced dataset class distribution:")
-print(df_balanced['is_fraudulent'].value_counts())
+    With `base_model`, the existing weights are updated with the new data
+    instead of retraining from scratch (the scaler is kept frozen).
+    """
+    if base_model is None:
+        model = fit_stream(new_incremental_model(), data_path, chunksize, exclude_fold=TEST_FOLD, epochs=epochs)
+    else:
+        model = as_incremental(base_model, data_path, chunksize)
+        model = fit_stream(model, data_path, chunksize, exclude_fold=TEST_FOLD, epochs=epochs, fit_scaler=False)
 
-# Add new transaction-related features
-df_balanced['transaction_time'] = np.random.randint(0, 86400, df_balanced.shape[0])  # Transaction time in seconds
-df_balanced['num_transactions_past_week'] = np.random.randint(1, 20, df_balanced.shape[0])  # Fake transaction count
-df_balanced['sender_encoded'] = df_balanced['sender'].astype('category').cat.codes
-df_balanced['receiver_encoded'] = df_balanced['receiver'].astype('category').cat.codes
+    # Evaluate model on the held-out fold
+    y_test, y_pred = predict_stream(model, data_path, chunksize, TEST_FOLD)
+    if len(y_test):
+        print(f"\nModel Accuracy: {accuracy_score(y_test, y_pred):.2f}")
+        print("\nClassification Report:\n", classification_report(y_test, y_pred, zero_division=0))
 
-# Prepare features and labels
-X = df_balanced[['amount', 'transaction_time', 'num_transactions_past_week', 'sender_encoded', 'receiver_encoded']].values
-y = df_balanced['is_fraudulent'].values
+    if run_cv and base_model is None:
+        scores = streaming_cross_validate(data_path, chunksize, epochs=epochs, n_jobs=cv_jobs)
+        print(f"\nCross-Validation Accuracy: {scores.mean():.2f} ± {scores.std():.2f}")
 
-# Split data into train-test
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return model
 
-# Use Logistic Regression to avoid overfitting
-model = LogisticRegression(max_iter=500)
 
-# Train model
-model.fit(X_train, y_train)
+def main():
+    parser = argparse.ArgumentParser(description="Train the fraud detection model.")
+    parser.add_argument("--data", default=DATA_PATH, help="Transactions CSV.")
+    parser.add_argument("--model", default=MODEL_PATH, help="Where the model is loaded from / saved to.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Rows per chunk; enables out-of-core incremental training.")
+    parser.add_argument("--update", action="store_true",
+                        help="Update the saved model with --data instead of retraining from scratch.")
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the data in streaming mode.")
+    parser.add_argument("--cv-jobs", type=int, default=-1, help="Parallel cross-validation workers (-1 = all cores).")
+    parser.add_argument("--no-cv", action="store_true", help="Skip cross-validation.")
+    parser.add_argument("--registry", default=REGISTRY_DIR, help="Model registry directory to publish to.")
+    parser.add_argument("--no-publish", action="store_true", help="Only write the pickle, do not publish.")
+    args = parser.parse_args()
 
-# Evaluate model
-y_pred = model.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
+    if args.update or args.chunksize:
+        chunksize = args.chunksize or 100_000
+        base_model = joblib.load(args.model) if args.update else None
+        model = train_streaming(args.data, chunksize, epochs=args.epochs, base_model=base_model,
+                                cv_jobs=args.cv_jobs, run_cv=not args.no_cv)
+    else:
+        model = train_in_memory(args.data, cv_jobs=args.cv_jobs, run_cv=not args.no_cv)
 
-print(f"\nModel Accuracy: {accuracy:.2f}")
-print("\nClassification Report:\n", classification_report(y_test, y_pred))
+    # Save model
+    joblib.dump(model, args.model)
+    print(f"[INFO] Model saved to {args.model}")
 
-# Use cross-validation for better evaluation
-cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-cross_val_scores = cross_val_score(model, X, y, cv=cv)
+    # Publish to the registry; serving processes hot-swap to it on their next poll
+    if not args.no_publish:
+        mode = "update" if args.update else "streaming" if args.chunksize else "in_memory"
+        ModelRegistry(args.registry).publish(model, metadata={"data": args.data, "mode": mode})
 
-print(f"\nCross-Validation Accuracy: {cross_val_scores.mean():.2f} ± {cross_val_scores.std():.2f}")
 
-# Save model
-joblib.dump(model, "fraud_detection_model.pkl")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import re
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from consensus.dag_blockchain import Block
+from consensus.dag_export import export_dag, layered_layout, load_records
+
+# index -> parent indices; 3 joins two branches, 5 branches off 1
+PARENTS = {0: [], 1: [0], 2: [0], 3: [1, 2], 4: [3], 5: [1]}
+EDGES = sorted((parent, child) for child, parents in PARENTS.items() for parent in parents)
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    blocks = []
+    for index, parents in PARENTS.items():
+        blocks.append(Block(index, [blocks[p].hash for p in parents], [f"tx{index}"], "<Node&1>", 0.75,
+                            timestamp=float(index)))
+    return blocks
+
+
+def test_json_export_round_trips_parents(blocks, tmp_path):
+    path = str(tmp_path / "dag.json")
+    assert export_dag(blocks, path, chunk_size=2) == len(PARENTS)
+
+    records = load_records(path)
+    assert {record["index"]: record["parents"] for record in records} == PARENTS
+    assert records[3]["hash"] == blocks[3].hash
+
+
+def test_graphml_export_is_well_formed(blocks, tmp_path):
+    path = str(tmp_path / "dag.graphml")
+    export_dag(blocks, path, chunk_size=2)
+
+    ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+    graph = ET.parse(path).getroot().find("g:graph", ns)
+    nodes = graph.findall("g:node", ns)
+    edges = sorted((int(e.get("source")[1:]), int(e.get("target")[1:])) for e in graph.findall("g:edge", ns))
+    assert [node.get("id") for node in nodes] == [f"b{index}" for index in PARENTS]
+    assert nodes[0].find("g:data[@key='proposer']", ns).text == "<Node&1>"  # Escaped on write
+    assert edges == EDGES
+
+
+def test_dot_export_lists_every_parent_edge(blocks, tmp_path):
+    path = str(tmp_path / "dag.gv")
+    export_dag(blocks, path, chunk_size=4)
+
+    text = open(path, encoding="utf-8").read()
+    assert text.startswith("digraph DAG {") and text.rstrip().endswith("}")
+    edges = sorted((int(a), int(b)) for a, b in re.findall(r"^\s*(\d+) -> (\d+);$", text, re.MULTILINE))
+    assert edges == EDGES
+
+
+def test_unknown_format_is_rejected(blocks, tmp_path):
+    with pytest.raises(ValueError):
+        export_dag(blocks, str(tmp_path / "dag.png"))
+
+
+def test_layered_layout_uses_longest_path_depth():
+    records = [{"index": index, "parents": parents} for index, parents in PARENTS.items()]
+    layout = layered_layout(records)
+
+    assert {index: x for index, (x, _) in layout.items()} == {0: 0, 1: 1, 2: 1, 3: 2, 4: 3, 5: 2}
+    assert layout[1][1] == -0.5 and layout[2][1] == 0.5  # Two-node layer centred on 0
+    assert layout[0][1] == 0 and layout[4][1] == 0
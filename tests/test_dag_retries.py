@@ -0,0 +1,115 @@
+import random
+import threading
+
+import pytest
+
+from consensus.clock import VirtualClock
+from consensus.dag_blockchain import PARKED, RETRY_BASE_DELAY, Block, DAGBlockchain
+from consensus.hybrid_consensus import UPBFT
+from consensus.trust_model import TrustModel
+
+
+@pytest.fixture
+def chain():
+    clock = VirtualClock()
+    trust_model = TrustModel(["A", "B"], clock=clock, rng=random.Random(0))
+    return DAGBlockchain(UPBFT(["A", "B"], f=0, trust_model=trust_model))
+
+
+def scripted_validation(monkeypatch, chain, results):
+    results = iter(results)
+    monkeypatch.setattr(chain, "validate_block", lambda block: next(results))
+
+
+def transactions(chain):
+    return [block.transactions for block in chain.blocks]
+
+
+def test_parked_block_commits_later_without_duplicate(monkeypatch, chain):
+    scripted_validation(monkeypatch, chain, ["RETRY", True, True])
+    committed, dropped = [], []
+
+    result = chain.add_block(["tx1"], "A", on_commit=committed.append, on_drop=dropped.append)
+    assert result is PARKED
+    assert not result
+    assert transactions(chain) == [["Genesis Block"]]
+
+    chain.clock.advance(RETRY_BASE_DELAY)
+    new_block = chain.add_block(["tx2"], "B")  # Due retries run first
+
+    assert new_block and new_block.transactions == ["tx2"]
+    assert [block.transactions for block in committed] == [["tx1"]]
+    assert dropped == []
+    assert transactions(chain) == [["Genesis Block"], ["tx1"], ["tx2"]]
+    assert chain.retry_queue == []
+    assert len({block.index for block in chain.blocks}) == len(chain.blocks)
+
+
+def test_parked_block_is_not_retried_before_backoff(monkeypatch, chain):
+    scripted_validation(monkeypatch, chain, ["RETRY", True])
+
+    assert chain.add_block(["tx1"], "A") is PARKED
+    assert chain.process_retries() == []
+
+    chain.clock.advance(RETRY_BASE_DELAY)
+    assert [block.transactions for block in chain.process_retries()] == [["tx1"]]
+    assert chain.process_retries() == []
+    assert transactions(chain) == [["Genesis Block"], ["tx1"]]
+
+
+def test_dropped_parked_block_notifies_caller(monkeypatch, chain):
+    scripted_validation(monkeypatch, chain, ["RETRY", False])
+    committed, dropped = [], []
+
+    assert chain.add_block(["tx1"], "A", on_commit=committed.append, on_drop=dropped.append) is PARKED
+    chain.clock.advance(RETRY_BASE_DELAY)
+    chain.process_retries()
+
+    assert committed == []
+    assert [block.transactions for block in dropped] == [["tx1"]]
+    assert transactions(chain) == [["Genesis Block"]]
+
+
+def test_retry_timer_commits_parked_block_without_new_traffic(monkeypatch, chain):
+    scripted_validation(monkeypatch, chain, ["RETRY", True])
+    committed = threading.Event()
+
+    assert chain.add_block(["tx1"], "A", on_commit=lambda block: committed.set()) is PARKED
+    chain.start_retry_timer(interval=0.01)
+    try:
+        chain.clock.advance(RETRY_BASE_DELAY)
+        assert committed.wait(timeout=5)
+    finally:
+        chain.stop_retry_timer()
+    assert transactions(chain) == [["Genesis Block"], ["tx1"]]
+
+
+def committed_block(chain, parents, trust_score):
+    block = Block(chain._allocate_index(), [parent.hash for parent in parents], ["tx"], "A", trust_score,
+                  timestamp=chain.clock.time())
+    return chain._commit_block(block)
+
+
+def test_low_weight_blocks_are_retried_or_rejected(chain):
+    genesis = chain.blocks[0]
+    heavy = committed_block(chain, [genesis], 1.0)
+    light = committed_block(chain, [heavy], 0.5)
+    medium = committed_block(chain, [light], 0.6)
+
+    def candidate(*parents):
+        return Block(chain._allocate_index(), [parent.hash for parent in parents], ["tx"], "B", 0.8,
+                     timestamp=chain.clock.time())
+
+    assert chain.validate_block(candidate(heavy, medium)) is True
+    assert chain.validate_block(candidate(light, medium)) == "RETRY"  # Near miss
+    assert chain.validate_block(candidate(heavy)) is False
+    assert chain.validate_block(candidate(light)) is False
+
+
+def test_parent_weight_is_checked_against_the_whole_dag(chain):
+    for _ in range(60):
+        parents = [chain.block_by_hash[h] for h in chain.get_parent_blocks()]
+        committed_block(chain, parents, 1.0)
+    block = Block(chain._allocate_index(), chain.get_parent_blocks(), ["tx"], "B", 1.0, timestamp=chain.clock.time())
+
+    assert chain.validate_block(block) is False  # Three parents never carry half of a 61-block DAG
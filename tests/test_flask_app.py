@@ -0,0 +1,18 @@
+import time
+
+import flask_app
+
+
+def test_idle_service_commits_parked_transaction(monkeypatch):
+    results = iter(["RETRY", True])
+    monkeypatch.setattr(flask_app.blockchain, "validate_block", lambda block: next(results))
+    client = flask_app.app.test_client()
+
+    response = client.post("/submit_transaction", json={"transaction": "parked-tx"})
+    assert response.status_code == 202
+
+    deadline = time.monotonic() + 5  # Backoff is RETRY_BASE_DELAY of wall time; no further requests are sent
+    while time.monotonic() < deadline and flask_app.blockchain.blocks[-1].transactions != ["parked-tx"]:
+        time.sleep(0.05)
+    chain = client.get("/get_blockchain").get_json()
+    assert [block["transactions"] for block in chain].count(["parked-tx"]) == 1
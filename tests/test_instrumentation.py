@@ -0,0 +1,39 @@
+import time
+
+from consensus import dag_blockchain
+from consensus.instrumentation import PHASE_METRIC, MetricsRegistry, metrics
+
+
+def test_histogram_buckets_are_cumulative_and_consistent():
+    registry = MetricsRegistry()
+    for value in (0.0001, 0.003, 7.0):
+        registry.observe("latency_seconds", value)
+    text = registry.render_prometheus()
+    assert 'latency_seconds_bucket{le="+Inf"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.005"} 2.0' in text
+    assert "latency_seconds_count 3.0" in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    registry.inc("blocks_total")
+    with registry.time("signing"):
+        pass
+    assert "blocks_total" not in registry.render_prometheus()
+
+
+def test_signing_latency_excludes_key_generation(monkeypatch):
+    newkeys = dag_blockchain.rsa.newkeys
+
+    def slow_newkeys(bits):
+        time.sleep(0.2)
+        return newkeys(bits)
+
+    monkeypatch.setattr(dag_blockchain, "_keys", None)
+    monkeypatch.setattr(dag_blockchain.rsa, "newkeys", slow_newkeys)
+    metrics.reset()
+
+    dag_blockchain.Block(0, [], ["tx"], "A")
+
+    signing = metrics.registry.get_sample_value(f"{PHASE_METRIC}_sum", {"phase": "signing"})
+    assert signing is not None and signing < 0.2
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import numpy as np
+
+from model_registry import LinearScorer, ModelRegistry
+
+
+def publish_one(root):
+    registry = ModelRegistry(root=str(root), legacy_model_path=str(root / "missing.pkl"))
+    registry.publish(LinearScorer(np.array([1.0, -1.0]), 0.0, np.array([0, 1])))
+    return registry
+
+
+def test_concurrent_first_load_never_returns_none(tmp_path, monkeypatch):
+    publish_one(tmp_path)
+    registry = ModelRegistry(root=str(tmp_path), legacy_model_path=str(tmp_path / "missing.pkl"))
+    load = registry.load
+
+    def slow_load(version):
+        time.sleep(0.2)
+        return load(version)
+
+    monkeypatch.setattr(registry, "load", slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.current())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert [scorer.version for scorer in results] == [1, 1, 1, 1]
+
+
+def test_empty_registry_returns_none_and_api_answers_503(tmp_path, monkeypatch):
+    registry = ModelRegistry(root=str(tmp_path), legacy_model_path=str(tmp_path / "missing.pkl"))
+    assert registry.current() is None
+
+    import api
+    monkeypatch.setattr(api, "model_registry", registry)
+    response = api.app.test_client().post(
+        "/predict", json={"transaction_id": 1, "sender": "a", "receiver": "b", "amount": 5})
+    assert response.status_code == 503
+
+
+def test_failed_reload_keeps_previous_scorer(tmp_path, monkeypatch):
+    registry = publish_one(tmp_path)
+    assert registry.current().version == 1
+    registry.publish(LinearScorer(np.array([2.0, -2.0]), 0.0, np.array([0, 1])))
+
+    def broken_load(version):
+        raise OSError("truncated file")
+
+    monkeypatch.setattr(registry, "load", broken_load)
+    registry._next_check = 0.0
+    assert registry.current().version == 1
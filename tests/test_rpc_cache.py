@@ -0,0 +1,90 @@
+import threading
+
+from consensus.clock import VirtualClock
+from consensus.trust_model import TrustModel
+from onchain.client import RpcClient, TTLCache
+from onchain.validator_sync import sync_trust_model
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("onchain.client.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=2.0)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    now[0] += 2.5
+    assert cache.get("k", "missing") == "missing"
+    assert len(cache) == 0
+
+
+def test_size_is_capped_least_recently_used_first():
+    cache = TTLCache(ttl=60.0, max_entries=3)
+    for key in "abc":
+        cache.set(key, key)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("d", "d")
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+
+
+def test_concurrent_writers_stay_within_bound():
+    cache = TTLCache(ttl=60.0, max_entries=500)
+
+    def writer(offset):
+        for i in range(5000):
+            cache.set((offset, i), i)
+            cache.get((offset, i - 1))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 500
+
+
+class FakeContract:
+    address = "0x0000000000000000000000000000000000000001"
+
+    def encode_abi(self, fn_name, args):
+        return "0x"
+
+    def get_function_by_name(self, fn_name):
+        class Function:
+            abi = {"outputs": [{"type": "uint256"}]}
+        return Function()
+
+
+def test_array_arguments_are_cached(monkeypatch):
+    from eth_abi import encode
+
+    client = RpcClient(cache_ttl=60.0)
+    calls = []
+
+    def batch(requests):
+        calls.append(requests)
+        return ["0x" + encode(["uint256"], [7]).hex()] * len(requests)
+
+    monkeypatch.setattr(client, "batch", batch)
+    contract = FakeContract()
+    assert client.read(contract, "sumOf", [1, 2, 3]) == 7
+    assert client.read(contract, "sumOf", [1, 2, 3]) == 7
+    assert client.read(contract, "sumOf", [1, 2, 4]) == 7
+    assert len(calls) == 2  # The repeated array read was served from the cache
+
+
+def test_validator_sync_stamps_virtual_time():
+    class FakeClient:
+        def read(self, contract, fn_name):
+            return ["0xabc"]
+
+        def read_many(self, reads):
+            return [5, 1, 0]
+
+    clock = VirtualClock(1000.0)
+    trust_model = TrustModel(["Node1"], clock=clock)
+    clock.advance(50)
+    sync_trust_model(trust_model, contract=None, client=FakeClient())
+
+    assert trust_model.last_activity["0xabc"] == 1050.0
@@ -0,0 +1,78 @@
+import pytest
+
+from consensus.sharding import ShardedDAGBlockchain, ShardError, _Shard, shard_for
+
+NODES = [f"Node{i}" for i in range(1, 9)]
+
+
+@pytest.fixture
+def chain():
+    with ShardedDAGBlockchain(NODES, num_shards=2, block_size=5, seed=0) as chain:
+        yield chain
+
+
+def test_call_drains_every_reply_before_raising(chain):
+    with pytest.raises(ShardError):
+        chain._call({0: ("abort", None), 1: ("abort", [])})  # Shard 0 fails, shard 1 replies 0
+
+    headers = chain.headers()
+    assert [header["shard"] for header in headers] == [0, 1]
+
+
+def test_cross_shard_inclusion_is_reported_separately():
+    transactions = [{"sender": f"a{i}", "receiver": f"b{i}"} for i in range(30)]
+    with ShardedDAGBlockchain(NODES, num_shards=2, block_size=10, seed=0) as chain:
+        summary = chain.submit(transactions)
+        committed, included = summary["cross_shard_committed"], summary["cross_shard_included"]
+        for _ in range(20):
+            if not summary["cross_shard_pending"]:
+                break
+            summary = chain.submit([])
+            included += summary["cross_shard_included"]
+
+    assert committed > 0
+    assert summary["cross_shard_pending"] == 0
+    assert included == committed
+
+
+def test_prepare_applies_backpressure_without_electing():
+    shard = _Shard(0, NODES[:4], f=1, seed=0, block_size=5, max_pending=2)
+    leader, rounds = shard.consensus.leader, shard.consensus.leader_rounds
+
+    votes = shard.prepare([(tx_id, f"tx{tx_id}", f"key{tx_id}") for tx_id in range(3)])
+
+    assert votes == {0: True, 1: True, 2: False}
+    assert (shard.consensus.leader, shard.consensus.leader_rounds) == (leader, rounds)
+    assert shard.commit([0, 1]) == [0, 1]
+    assert shard.pending == [] and shard.header()["transactions"] == 2
+
+
+def test_same_sender_cross_shard_transfers_are_all_committed():
+    with ShardedDAGBlockchain(NODES, num_shards=2, block_size=10, seed=0) as chain:
+        receivers = [name for name in (f"r{i}" for i in range(50))
+                     if shard_for(name, 2) != shard_for("alice", 2)][:4]
+        summary = chain.submit([{"sender": "alice", "receiver": receiver} for receiver in receivers])
+
+    assert summary["cross_shard_committed"] == 4
+    assert summary["cross_shard_aborted"] == []
+
+
+def test_aborted_cross_shard_transactions_are_returned():
+    with ShardedDAGBlockchain(NODES, num_shards=2, block_size=10, seed=0, max_pending=1) as chain:
+        transactions = [{"sender": f"a{i}", "receiver": f"b{i}"} for i in range(20)]
+        cross = [tx for tx in transactions if shard_for(tx["sender"], 2) != shard_for(tx["receiver"], 2)]
+        summary = chain.submit(transactions)
+
+    assert summary["cross_shard_aborted"]
+    assert all(tx in cross for tx in summary["cross_shard_aborted"])
+    assert summary["cross_shard_committed"] + len(summary["cross_shard_aborted"]) == len(cross)
+
+
+def test_submit_checkpoints_every_n_rounds():
+    with ShardedDAGBlockchain(NODES, num_shards=2, block_size=10, seed=0, checkpoint_every=2) as chain:
+        for round_number in range(5):
+            chain.submit([{"sender": f"a{round_number}", "receiver": None}])
+        checkpoints = chain.checkpoints
+
+    assert [checkpoint["sequence"] for checkpoint in checkpoints] == [0, 1]
+    assert checkpoints[1]["previous"] == checkpoints[0]["hash"]
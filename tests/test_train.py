@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import train
+
+
+@pytest.fixture
+def unsorted_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        "sender": rng.choice(["a", "b", "c"], n),
+        "receiver": rng.choice(["x", "y"], n),
+        "amount": rng.uniform(1, 100, n),
+        "is_fraudulent": rng.integers(0, 2, n),
+        "timestamp": rng.permutation(np.arange(n) * 600.0) + 1.7e9,
+    })
+    path = tmp_path / "transactions.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_in_memory_training_replays_history_in_time_order(unsorted_csv, monkeypatch):
+    seen = []
+    add_features = train.add_features
+
+    def recording_add_features(df, rng, store):
+        seen.append(df["timestamp"].to_numpy().copy())
+        return add_features(df, rng, store)
+
+    monkeypatch.setattr(train, "add_features", recording_add_features)
+    train.train_in_memory(str(unsorted_csv), cv_jobs=1, run_cv=False)
+    assert np.all(np.diff(seen[0]) >= 0)
+
+
+def test_out_of_core_training_rejects_unsorted_file(unsorted_csv):
+    with pytest.raises(ValueError, match="backwards"):
+        list(train.prepared_chunks(str(unsorted_csv), chunksize=50))
+
+
+def test_ensure_time_order_checks_across_chunks():
+    last = train.ensure_time_order(np.array([1.0, 2.0, 2.0]))
+    assert last == 2.0
+    with pytest.raises(ValueError):
+        train.ensure_time_order(np.array([1.5, 3.0]), last)
@@ -0,0 +1,23 @@
+import pytest
+
+from consensus.uav_testbed import HOUR, UAVTestbed
+
+
+def test_discrete_event_run_advances_virtual_time_and_is_reproducible():
+    runs = []
+    for _ in range(2):
+        testbed = UAVTestbed.virtual(8, seed=1)
+        stats = testbed.simulate_discrete_events(12 * HOUR, tx_rate=0.05, join_rate=2 / HOUR, leave_rate=2 / HOUR)
+        blocks = testbed.blockchain.blocks
+        runs.append((stats["events"], [block.hash for block in blocks]))
+        assert stats["virtual_seconds"] == testbed.clock.time() == 12 * HOUR
+        assert all(0 <= block.timestamp <= 12 * HOUR for block in blocks)  # Virtual, not wall, time
+
+    events, _ = runs[0]
+    assert runs[0] == runs[1]
+    assert events["transaction"] > 0 and events["leave"] > 0 and events["join"] > 0
+
+
+def test_discrete_event_mode_needs_a_virtual_clock():
+    with pytest.raises(TypeError):
+        UAVTestbed(4, seed=0).simulate_discrete_events(60)